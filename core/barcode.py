@@ -0,0 +1,78 @@
+import re
+
+GTIN_LENGTHS = (8, 12, 13, 14)
+
+_DIGITAL_LINK = re.compile(r"/01/(\d{8,14})(?:[/?#]|$)")
+_OFF_URL = re.compile(r"/product/(\d{8,14})(?:[/?#]|$)")
+_ELEMENT_STRING = re.compile(r"^(?:\]C1|\]Q3|\]d2)?\(?01\)?(\d{14})")
+_DIGITS = re.compile(r"\d{8,14}")
+
+
+def gtin_check_digit(body):
+    # Weights alternate 3,1,3,... starting from the digit next to the check digit
+    total = sum(int(d) * (3 if i % 2 == 0 else 1) for i, d in enumerate(reversed(body)))
+    return str((10 - total % 10) % 10)
+
+
+def is_valid_gtin(code):
+    return (code.isdigit() and len(code) in GTIN_LENGTHS
+            and gtin_check_digit(code[:-1]) == code[-1])
+
+
+def expand_upce(code):
+    if len(code) != 8 or not code.isdigit() or code[0] not in "01":
+        return None
+    system, d, check = code[0], code[1:7], code[7]
+    last = d[5]
+    if last in "012":
+        body = d[0:2] + last + "0000" + d[2:5]
+    elif last == "3":
+        body = d[0:3] + "00000" + d[3:5]
+    elif last == "4":
+        body = d[0:4] + "00000" + d[4]
+    else:
+        body = d[0:5] + "0000" + last
+    return system + body + check
+
+
+def _symbology(kind):
+    return re.sub(r"[^A-Z0-9]", "", str(kind or "").upper().replace("BARCODEFORMAT", ""))
+
+
+def canonicalize_gtin(digits, symbology=""):
+    if symbology == "UPCE" and len(digits) == 8:
+        digits = expand_upce(digits) or ""
+    if not is_valid_gtin(digits):
+        return None
+    if len(digits) == 12:
+        digits = "0" + digits
+    elif len(digits) == 14 and digits[0] == "0":
+        digits = digits[1:]
+    # A zero-padded GTIN-8 (as carried in GS1 element strings and Digital Links) is the EAN-8
+    if len(digits) == 13 and digits.startswith("00000"):
+        return digits[5:]
+    return digits
+
+
+def canonicalize_barcode(data, kind=None):
+    if isinstance(data, bytes):
+        data = data.decode("utf-8", "replace")
+    data = data.strip()
+    symbology = _symbology(kind)
+
+    if data.isdigit():
+        if len(data) in GTIN_LENGTHS:
+            return canonicalize_gtin(data, symbology)
+        # Unbracketed GS1 element string, e.g. "01" + GTIN-14 + further AIs
+        match = _ELEMENT_STRING.match(data)
+        return canonicalize_gtin(match.group(1)) if match else None
+
+    # QR / Data Matrix payloads: GS1 Digital Link, Open Food Facts URLs, GS1 element strings
+    for pattern in (_DIGITAL_LINK, _OFF_URL, _ELEMENT_STRING):
+        match = pattern.search(data)
+        if match:
+            return canonicalize_gtin(match.group(1))
+    match = _DIGITS.fullmatch(re.sub(r"[\s-]", "", data))
+    if match:
+        return canonicalize_gtin(match.group(0))
+    return None
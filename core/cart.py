@@ -1,38 +1,168 @@
-from .nutrition import calculate_health_score, safe_float
+import sys
+
+from . import nutrition
+from .nutrition import (product_health_score, names_in_mask, ALLERGENS, ALLERGEN_BITS,
+                        SUSPICIOUS_ADDITIVES, UNHEALTHY_INGREDIENTS)
+from .challenges import DEFAULT_RULESET
+
+class CartLine:
+    # A cart line is just (shared product, weight); nutrients are scaled on demand
+    __slots__ = ("product", "weight")
+
+    def __init__(self, product, weight=100.0):
+        self.product = product
+        self.weight = float(weight)
+
+    @property
+    def name(self):
+        return self.product.name
+
+    @property
+    def ingredient_analysis(self):
+        return self.product.ingredient_analysis
+
+    @property
+    def calories(self):
+        return self.product.calories * self.weight / 100.0
+
+    @property
+    def fat(self):
+        return self.product.fat * self.weight / 100.0
+
+    @property
+    def protein(self):
+        return self.product.protein * self.weight / 100.0
+
+def cart_line_bytes():
+    # Per-line memory excluding the shared product; constant regardless of product size
+    return sys.getsizeof(CartLine(None))
+
+class MaskAggregate:
+    # Per-bit counts so both OR ("some item has it") and AND ("every item has it")
+    # stay exact when items are removed; each update is O(bits), not O(items)
+    def __init__(self, width):
+        self.width = width
+        self.reset()
+
+    def reset(self):
+        self.counts = [0] * self.width
+        self.items = 0
+        self.any = 0
+        self.all = 0
+
+    def update(self, mask, sign):
+        self.items += sign
+        for bit in range(self.width):
+            if mask >> bit & 1:
+                self.counts[bit] += sign
+        self.any = sum(1 << bit for bit, count in enumerate(self.counts) if count > 0)
+        self.all = (sum(1 << bit for bit, count in enumerate(self.counts) if count == self.items)
+                    if self.items else 0)
 
 class Cart:
-    def __init__(self):
+    def __init__(self, ruleset=DEFAULT_RULESET):
         self.items = []
+        self.ruleset = ruleset
+        self.challenges = ruleset.new_state()
+        self._reset_totals()
+
+    def _reset_totals(self):
+        self.allergens = MaskAggregate(len(ALLERGENS))
+        self.additives = MaskAggregate(len(SUSPICIOUS_ADDITIVES))
+        self.unhealthy = MaskAggregate(len(UNHEALTHY_INGREDIENTS))
+        self._taxonomy_version = nutrition.taxonomy_version
+        # Every quantity a challenge rule can read: nutrients, "items" and "allergen:<name>" counts
+        self._totals = {"calories": 0.0, "fat": 0.0, "protein": 0.0, "items": 0}
+        self._health_score = 0
+        self.challenges.reset()
+
+    def _apply(self, line, sign):
+        # Running totals are updated once per add/remove so every total below is O(1),
+        # and only the challenge rules reading a changed quantity are re-checked
+        totals = self._totals
+        totals["calories"] += sign * line.calories
+        totals["fat"] += sign * line.fat
+        totals["protein"] += sign * line.protein
+        totals["items"] += sign
+        changed = ["calories", "fat", "protein", "items"]
+        product = line.product
+        # Scoring first brings the product's masks up to the current taxonomy
+        health_score = product_health_score(product)
+        self.allergens.update(product.allergen_mask, sign)
+        self.additives.update(product.additive_mask, sign)
+        self.unhealthy.update(product.unhealthy_mask, sign)
+        for allergen in names_in_mask(product.allergen_mask):
+            key = f"allergen:{allergen}"
+            totals[key] = totals.get(key, 0) + sign
+            changed.append(key)
+        self._health_score += sign * health_score
+        self.challenges.update(totals, changed)
+
+    def _check_taxonomy(self):
+        # A taxonomy change invalidates every per-product score and mask: rebuild once
+        if self._taxonomy_version != nutrition.taxonomy_version:
+            self._reset_totals()
+            for line in self.items:
+                self._apply(line, 1)
+
+    def add_item(self, product, weight=100.0):
+        self._check_taxonomy()
+        line = CartLine(product, weight)
+        self.items.append(line)
+        self._apply(line, 1)
+        return line
+
+    def remove_item(self, index=-1):
+        self._check_taxonomy()
+        line = self.items.pop(index)
+        if self.items:
+            self._apply(line, -1)
+        else:
+            self._reset_totals()
+        return line
 
-    def add_item(self, product):
-        self.items.append(product)
+    def total(self, key):
+        return self._totals.get(key, 0)
 
     def total_calories(self):
-        return sum(safe_float(item.get('calories', 0)) for item in self.items)
+        return self._totals["calories"]
 
     def total_fat(self):
-        return sum(safe_float(item.get('fat', 0)) for item in self.items)
+        return self._totals["fat"]
 
     def total_protein(self):
-        return sum(safe_float(item.get('protein', 0)) for item in self.items)
+        return self._totals["protein"]
 
     def total_health_score(self):
-        return sum(calculate_health_score(item['ingredient_analysis']) for item in self.items)
+        self._check_taxonomy()
+        return self._health_score
+
+    def contains_any_allergen(self, mask):
+        self._check_taxonomy()
+        return bool(self.allergens.any & mask)
+
+    def allergen_warnings(self):
+        self._check_taxonomy()
+        return names_in_mask(self.allergens.any, ALLERGEN_BITS)
+
+    def challenge_passed(self, key):
+        self._check_taxonomy()
+        return self.challenges.passed(key)
+
+    def challenge_results(self):
+        self._check_taxonomy()
+        return self.challenges.results()
 
     def challenge_1500_kcal(self):
-        return self.total_calories() <= 1500
+        return self.challenge_passed("challenge_1500_kcal")
 
     def challenge_protein_rich(self):
-        return self.total_protein() >= 60 and self.total_fat() <= 50
+        return self.challenge_passed("challenge_protein_rich")
 
     def game_score(self):
-        score = self.total_health_score()
-        if self.challenge_1500_kcal():
-            score += 50
-        if self.challenge_protein_rich():
-            score += 30
-        return score
+        self._check_taxonomy()
+        return self._health_score + self.challenges.bonus
 
     def clear(self):
         self.items = []
-
+        self._reset_totals()
@@ -0,0 +1,95 @@
+import numpy as np
+
+from .challenges import DEFAULT_RULESET
+from .nutrition import ALLERGENS, product_health_score
+
+NUTRIENTS = ("calories", "protein", "fat")
+CALORIES, PROTEIN, FAT = range(len(NUTRIENTS))
+
+
+class CartMatrix:
+    # Column layout of a cart: per-100 g nutrient matrix (lines x NUTRIENTS), per-line
+    # health scores and a weight vector in grams. A line with weight 0 is out of the cart.
+    def __init__(self, per100g, health, weights, names=None, allergens=None, ruleset=DEFAULT_RULESET):
+        self.per100g = np.asarray(per100g, dtype=np.float64).reshape(-1, len(NUTRIENTS))
+        self.health = np.asarray(health, dtype=np.float64)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.names = list(names) if names is not None else None
+        if allergens is None:
+            allergens = np.zeros((len(self.health), len(ALLERGENS)), dtype=bool)
+        self.allergens = np.asarray(allergens, dtype=bool)
+        self.ruleset = ruleset
+
+    @classmethod
+    def from_products(cls, products, weights, ruleset=DEFAULT_RULESET):
+        products = list(products)
+        per100g = np.array([(p.calories, p.protein, p.fat) for p in products], dtype=np.float64)
+        health = np.fromiter((product_health_score(p) for p in products),
+                             dtype=np.float64, count=len(products))
+        masks = np.fromiter((p.allergen_mask for p in products), dtype=np.int64, count=len(products))
+        allergens = (masks[:, None] >> np.arange(len(ALLERGENS))) & 1
+        return cls(per100g, health, weights, [p.name for p in products], allergens, ruleset)
+
+    @classmethod
+    def from_cart(cls, cart):
+        return cls.from_products((line.product for line in cart.items),
+                                 [line.weight for line in cart.items], cart.ruleset)
+
+    def __len__(self):
+        return len(self.weights)
+
+    def _weights(self, weights):
+        return self.weights if weights is None else np.asarray(weights, dtype=np.float64)
+
+    def totals(self, weights=None):
+        # (n,) -> (3,), or a batch (m, n) -> (m, 3)
+        return self._weights(weights) @ self.per100g / 100.0
+
+    def total_health_score(self, weights=None):
+        return (self._weights(weights) > 0) @ self.health
+
+    def quantity(self, key, weights=None):
+        # Same quantities the Cart exposes to challenge rules, for one cart or a batch
+        w = self._weights(weights)
+        if key in NUTRIENTS:
+            return self.totals(w)[..., NUTRIENTS.index(key)]
+        present = (w > 0).astype(np.float64)
+        if key == "items":
+            return present.sum(axis=-1)
+        if key.startswith("allergen:"):
+            return present @ self.allergens[:, ALLERGENS.index(key.split(":", 1)[1])]
+        raise KeyError(key)
+
+    def challenges(self, weights=None):
+        w = self._weights(weights)
+        quantities = {key: self.quantity(key, w) for key in self.ruleset.keys()}
+        passed = {}
+        for challenge in self.ruleset.challenges:
+            ok = np.ones(w.shape[:-1], dtype=bool)
+            for rule in challenge.rules:
+                lo, hi = rule.bounds()
+                value = quantities[rule.key]
+                ok &= (value >= lo) & (value <= hi)
+            passed[challenge.key] = ok
+        return passed
+
+    def game_score(self, weights=None):
+        w = self._weights(weights)
+        passed = self.challenges(w)
+        score = self.total_health_score(w)
+        for challenge in self.ruleset.challenges:
+            score = score + challenge.bonus * passed[challenge.key]
+        return score
+
+    def evaluate(self, candidate_weights):
+        # What-if evaluation of many carts at once: one row of weights per candidate
+        candidate_weights = np.atleast_2d(np.asarray(candidate_weights, dtype=np.float64))
+        totals = self.totals(candidate_weights)
+        result = {name: totals[:, i] for i, name in enumerate(NUTRIENTS)}
+        result.update(self.challenges(candidate_weights))
+        result["health_score"] = self.total_health_score(candidate_weights)
+        result["game_score"] = self.game_score(candidate_weights)
+        return result
+
+    def with_weights(self, weights):
+        return CartMatrix(self.per100g, self.health, weights, self.names, self.allergens, self.ruleset)
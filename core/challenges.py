@@ -0,0 +1,127 @@
+import math
+
+
+class NutrientBound:
+    __slots__ = ("nutrient", "minimum", "maximum")
+
+    def __init__(self, nutrient, minimum=None, maximum=None):
+        self.nutrient = nutrient
+        self.minimum = minimum
+        self.maximum = maximum
+
+    @property
+    def key(self):
+        return self.nutrient
+
+    def bounds(self):
+        lo = -math.inf if self.minimum is None else self.minimum
+        hi = math.inf if self.maximum is None else self.maximum
+        return lo, hi
+
+
+class ExcludeAllergen:
+    __slots__ = ("allergen",)
+
+    def __init__(self, allergen):
+        self.allergen = allergen
+
+    @property
+    def key(self):
+        return f"allergen:{self.allergen}"
+
+    def bounds(self):
+        return -math.inf, 0
+
+
+class ItemCount:
+    __slots__ = ("minimum", "maximum")
+
+    def __init__(self, minimum=None, maximum=None):
+        self.minimum = minimum
+        self.maximum = maximum
+
+    key = "items"
+
+    def bounds(self):
+        lo = -math.inf if self.minimum is None else self.minimum
+        hi = math.inf if self.maximum is None else self.maximum
+        return lo, hi
+
+
+class Challenge:
+    __slots__ = ("key", "label", "rules", "bonus")
+
+    def __init__(self, key, label, rules, bonus):
+        self.key = key
+        self.label = label
+        self.rules = tuple(rules)
+        self.bonus = bonus
+
+
+DEFAULT_CHALLENGES = (
+    Challenge("challenge_1500_kcal", "Under 1500 kcal",
+              [NutrientBound("calories", maximum=1500)], 50),
+    Challenge("challenge_protein_rich", "High Protein, Low Fat",
+              [NutrientBound("protein", minimum=60), NutrientBound("fat", maximum=50)], 30),
+)
+
+
+class CompiledChallenges:
+    # Flattens every rule into (challenge index, lo, hi) and indexes them by the cart
+    # quantity they read, so a change to one quantity only re-checks the rules using it.
+    def __init__(self, challenges):
+        self.challenges = tuple(challenges)
+        self.index = {c.key: i for i, c in enumerate(self.challenges)}
+        self.bonuses = [c.bonus for c in self.challenges]
+        self.rules = []
+        self.by_key = {}
+        for ci, challenge in enumerate(self.challenges):
+            for rule in challenge.rules:
+                lo, hi = rule.bounds()
+                self.by_key.setdefault(rule.key, []).append(len(self.rules))
+                self.rules.append((ci, rule.key, lo, hi))
+
+    def keys(self):
+        return self.by_key.keys()
+
+    def new_state(self):
+        return ChallengeState(self)
+
+
+class ChallengeState:
+    def __init__(self, compiled):
+        self.compiled = compiled
+        self.reset()
+
+    def reset(self):
+        compiled = self.compiled
+        self.rule_ok = [lo <= 0 <= hi for _, _, lo, hi in compiled.rules]
+        self.failing = [0] * len(compiled.challenges)
+        for (ci, _, _, _), ok in zip(compiled.rules, self.rule_ok):
+            if not ok:
+                self.failing[ci] += 1
+        self.bonus = sum(b for b, f in zip(compiled.bonuses, self.failing) if f == 0)
+
+    def update(self, values, changed_keys):
+        compiled = self.compiled
+        rules = compiled.rules
+        for key in changed_keys:
+            for ri in compiled.by_key.get(key, ()):
+                ci, _, lo, hi = rules[ri]
+                ok = lo <= values.get(key, 0) <= hi
+                if ok == self.rule_ok[ri]:
+                    continue
+                self.rule_ok[ri] = ok
+                was_passing = self.failing[ci] == 0
+                self.failing[ci] += -1 if ok else 1
+                if was_passing != (self.failing[ci] == 0):
+                    self.bonus += compiled.bonuses[ci] if ok else -compiled.bonuses[ci]
+
+    def passed(self, key):
+        return self.failing[self.compiled.index[key]] == 0
+
+    def results(self):
+        return [(c, f == 0) for c, f in zip(self.compiled.challenges, self.failing)]
+
+
+DEFAULT_RULESET = CompiledChallenges(DEFAULT_CHALLENGES)
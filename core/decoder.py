@@ -0,0 +1,296 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import namedtuple
+
+import numpy as np
+import cv2
+
+from .barcode import gtin_check_digit
+
+Point = namedtuple("Point", ["x", "y"])
+Decoded = namedtuple("Decoded", ["data", "type", "polygon"])
+
+
+class DecoderBackend(ABC):
+    name = "base"
+
+    @abstractmethod
+    def available(self):
+        ...
+
+    @abstractmethod
+    def decode(self, frame):
+        ...
+
+
+class PyzbarBackend(DecoderBackend):
+    name = "pyzbar"
+
+    def __init__(self):
+        try:
+            from pyzbar import pyzbar
+        except ImportError:  # also raised when the zbar shared library is missing
+            pyzbar = None
+        self._pyzbar = pyzbar
+
+    def available(self):
+        return self._pyzbar is not None
+
+    def decode(self, frame):
+        return [Decoded(r.data, r.type, r.polygon) for r in self._pyzbar.decode(frame)]
+
+
+class OpenCVBackend(DecoderBackend):
+    name = "opencv"
+
+    def __init__(self):
+        barcode_cls = getattr(getattr(cv2, "barcode", None), "BarcodeDetector", None)
+        barcode_cls = barcode_cls or getattr(cv2, "barcode_BarcodeDetector", None)
+        self._barcode = barcode_cls() if barcode_cls else None
+        self._qr = cv2.QRCodeDetector()
+
+    def available(self):
+        return self._barcode is not None
+
+    def decode(self, frame):
+        results = []
+        if hasattr(self._barcode, "detectAndDecodeWithType"):
+            ok, infos, types, points = self._barcode.detectAndDecodeWithType(frame)
+        else:
+            ok, infos, types, points = self._barcode.detectAndDecode(frame)
+        if ok:
+            for info, kind, quad in zip(infos, types, points):
+                if info:
+                    results.append(Decoded(info.encode("utf-8"), kind, _quad_to_polygon(quad)))
+
+        ok, infos, points, _ = self._qr.detectAndDecodeMulti(frame)
+        if ok:
+            for info, quad in zip(infos, points):
+                if info:
+                    results.append(Decoded(info.encode("utf-8"), "QRCODE", _quad_to_polygon(quad)))
+        return results
+
+
+class ZXingBackend(DecoderBackend):
+    name = "zxing"
+
+    def __init__(self):
+        try:
+            import zxingcpp
+        except ImportError:
+            zxingcpp = None
+        self._zxing = zxingcpp
+
+    def available(self):
+        return self._zxing is not None
+
+    def decode(self, frame):
+        results = []
+        for r in self._zxing.read_barcodes(frame):
+            pos = r.position
+            polygon = [Point(p.x, p.y) for p in (pos.top_left, pos.top_right, pos.bottom_right, pos.bottom_left)]
+            results.append(Decoded(r.text.encode("utf-8"), str(r.format), polygon))
+        return results
+
+
+BACKENDS = [PyzbarBackend, OpenCVBackend, ZXingBackend]
+
+
+def _quad_to_polygon(quad):
+    return [Point(int(x), int(y)) for x, y in np.asarray(quad).reshape(-1, 2)]
+
+
+# --- Synthetic benchmark frames ---
+
+EAN_L = ["0001101", "0011001", "0010011", "0111101", "0100011",
+         "0110001", "0101111", "0111011", "0110111", "0001011"]
+EAN_G = [code[::-1] for code in
+         ["1110010", "1100110", "1101100", "1000010", "1011100",
+          "1001110", "1010000", "1000100", "1001000", "1110100"]]
+EAN_R = ["".join("1" if bit == "0" else "0" for bit in code) for code in EAN_L]
+EAN_PARITY = ["LLLLLL", "LLGLGG", "LLGGLG", "LLGGGL", "LGLLGG",
+              "LGGLLG", "LGGGLL", "LGLGLG", "LGLGGL", "LGGLGL"]
+
+
+def render_ean13(code, module=3, height=120, quiet=10):
+    parity = EAN_PARITY[int(code[0])]
+    bits = "101"
+    for digit, side in zip(code[1:7], parity):
+        bits += (EAN_L if side == "L" else EAN_G)[int(digit)]
+    bits += "01010"
+    for digit in code[7:]:
+        bits += EAN_R[int(digit)]
+    bits += "101"
+
+    row = np.array([0 if b == "1" else 255 for b in "0" * quiet + bits + "0" * quiet], np.uint8)
+    row = np.repeat(row, module)
+    return np.tile(row, (height, 1))
+
+
+def render_qr(text, scale=6):
+    encoder = cv2.QRCodeEncoder.create()
+    qr = encoder.encode(text)
+    return cv2.resize(qr, None, fx=scale, fy=scale, interpolation=cv2.INTER_NEAREST)
+
+
+def _place_on_frame(symbol, rng, size=(480, 640)):
+    frame = np.full(size, 200, np.uint8)
+    h, w = symbol.shape[:2]
+    y = int(rng.integers(0, size[0] - h))
+    x = int(rng.integers(0, size[1] - w))
+    frame[y:y + h, x:x + w] = symbol
+    noise = rng.normal(0, 8, size)
+    frame = np.clip(frame + noise, 0, 255).astype(np.uint8)
+    return cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+
+
+def synthetic_frames(count=20, seed=0):
+    rng = np.random.default_rng(seed)
+    frames = []
+    for i in range(count):
+        if i % 4 == 3:
+            payload = f"https://world.openfoodfacts.org/product/{int(rng.integers(10 ** 12, 10 ** 13))}"
+            try:
+                symbol = render_qr(payload)
+            except (AttributeError, cv2.error):
+                continue
+        else:
+            digits = "".join(str(d) for d in rng.integers(0, 10, 12))
+            payload = digits + gtin_check_digit(digits)
+            symbol = render_ean13(payload)
+        frames.append((_place_on_frame(symbol, rng), payload))
+    return frames
+
+
+# --- Selection ---
+
+def benchmark_backends(backends=None, frames=None, repeats=1):
+    if backends is None:
+        backends = [cls() for cls in BACKENDS]
+    if frames is None:
+        frames = synthetic_frames()
+
+    results = []
+    for backend in backends:
+        if not backend.available():
+            continue
+        hits = 0
+        elapsed = 0.0
+        for _ in range(repeats):
+            for frame, expected in frames:
+                start = time.perf_counter()
+                decoded = _safe_decode(backend, frame)
+                elapsed += time.perf_counter() - start
+                if any(d.data.decode("utf-8", "replace") == expected for d in decoded):
+                    hits += 1
+        runs = max(1, len(frames) * repeats)
+        results.append({
+            "name": backend.name,
+            "backend": backend,
+            "accuracy": hits / runs,
+            "mean_ms": elapsed / runs * 1000,
+        })
+    return results
+
+
+_active_backend = None
+
+
+def select_decoder(min_accuracy=0.9, frames=None):
+    global _active_backend
+    results = benchmark_backends(frames=frames)
+    if not results:
+        raise RuntimeError("No barcode decoder backend is available")
+
+    passing = [r for r in results if r["accuracy"] >= min_accuracy]
+    if passing:
+        best = min(passing, key=lambda r: r["mean_ms"])
+    else:
+        best = max(results, key=lambda r: r["accuracy"])
+    _active_backend = best["backend"]
+    return results
+
+
+def set_decoder(name):
+    global _active_backend
+    for cls in BACKENDS:
+        if cls.name == name:
+            backend = cls()
+            if not backend.available():
+                raise RuntimeError(f"Decoder backend '{name}' is not available")
+            _active_backend = backend
+            return backend
+    raise ValueError(f"Unknown decoder backend '{name}'")
+
+
+_fallback_backend = None
+_selection_thread = None
+
+
+def start_decoder_selection(min_accuracy=0.9):
+    # Benchmarks the backends on a worker thread; decode() uses the fallback until it is done
+    global _selection_thread
+    if _active_backend is None and _selection_thread is None:
+        _selection_thread = threading.Thread(target=select_decoder, args=(min_accuracy,), daemon=True)
+        _selection_thread.start()
+    return _selection_thread
+
+
+def _fallback():
+    # First available backend in preference order (pyzbar first), without benchmarking
+    global _fallback_backend
+    if _fallback_backend is None:
+        for cls in BACKENDS:
+            backend = cls()
+            if backend.available():
+                _fallback_backend = backend
+                break
+        else:
+            raise RuntimeError("No barcode decoder backend is available")
+    return _fallback_backend
+
+
+def get_decoder():
+    # Never benchmarks on the caller's thread, which is usually the GUI thread
+    if _active_backend is None:
+        return _fallback()
+    return _active_backend
+
+
+_preprocessor = None
+_preprocessing_enabled = True
+
+
+def set_preprocessing(enabled):
+    global _preprocessing_enabled
+    _preprocessing_enabled = enabled
+
+
+def _safe_decode(backend, frame):
+    # A detector error on one frame is a miss; raised from the scanner's timer slot it
+    # would take the whole app down
+    try:
+        return backend.decode(frame)
+    except cv2.error:
+        return []
+
+
+def decode(frame):
+    global _preprocessor
+    backend = get_decoder()
+    if not _preprocessing_enabled:
+        return _safe_decode(backend, frame)
+    if _preprocessor is None:
+        from .preprocess import Preprocessor
+        _preprocessor = Preprocessor()
+    try:
+        return _preprocessor.decode(frame, lambda image: _safe_decode(backend, image))
+    except cv2.error:
+        return []
+
+
+if __name__ == "__main__":
+    for r in select_decoder():
+        print(f"{r['name']:>8}: accuracy {r['accuracy']:.0%}, {r['mean_ms']:.2f} ms/frame")
+    print(f"Selected: {get_decoder().name}")
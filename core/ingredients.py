@@ -0,0 +1,116 @@
+import re
+import sys
+from functools import lru_cache
+
+OPEN = "([{"
+CLOSE = ")]}"
+SEPARATORS = ",;"
+# Conjunctions that join two ingredients in the languages Open Food Facts sees most. Words
+# that mean "and" in one language but something else in another (Dutch "en" is French and
+# Spanish "in") are left out, as in "lait écrémé en poudre".
+CONJUNCTIONS = frozenset(["and", "&", "et", "und", "og", "och"])
+
+_PERCENT = re.compile(r"(?:<\s*)?(\d+(?:[.,]\d+)?)\s*%")
+_HEADING = re.compile(r"^\s*(?:ingredients?|ingrédients|zutaten|ingredientes|ingredienti)\s*:\s*", re.I)
+
+
+class Ingredient:
+    __slots__ = ("name", "percent", "children")
+
+    def __init__(self, name, percent=None, children=()):
+        self.name = name
+        self.percent = percent
+        self.children = children
+
+    def __repr__(self):
+        return f"Ingredient({self.name!r}, {self.percent!r}, {list(self.children)!r})"
+
+
+def _make(text, children, percent=None):
+    match = _PERCENT.search(text)
+    if match:
+        percent = float(match.group(1).replace(",", "."))
+        text = text[:match.start()] + text[match.end():]
+    name = " ".join(text.replace("_", " ").replace("*", " ").split()).strip(" .:-")
+    if not name and not children:
+        return []
+    return [Ingredient(sys.intern(name), percent, tuple(children))]
+
+
+def _finish(chars, brackets):
+    # Splits a finished item on conjunctions. Each bracket's sub-ingredients and percentage
+    # belong to the part that was being read when the bracket opened.
+    text = "".join(chars)
+    parts, current, start = [], [], 0
+    for word in re.finditer(r"\S+", text):
+        if word.group() in CONJUNCTIONS and current:
+            parts.append((start, " ".join(current)))
+            current = []
+        else:
+            if not current:
+                start = word.start()
+            current.append(word.group())
+    parts.append((start, " ".join(current)))
+
+    items = []
+    for i, (start, part) in enumerate(parts):
+        end = parts[i + 1][0] if i + 1 < len(parts) else len(text) + 1
+        children, percent = [], None
+        for anchor, inner, inner_percent in brackets:
+            # The first part owns brackets opened before any word was read
+            if start <= anchor < end or (i == 0 and anchor < start):
+                children.extend(inner)
+                if inner_percent is not None:
+                    percent = inner_percent
+        items.extend(_make(part, children, percent))
+    return items
+
+
+def _close(frame):
+    # A bracket holding only a percentage, as in "tomatoes (45%)", is the parent's share
+    items, chars, brackets = frame
+    text = "".join(chars).strip()
+    match = _PERCENT.fullmatch(text)
+    if not items and not brackets and match:
+        return [], float(match.group(1).replace(",", "."))
+    items.extend(_finish(chars, brackets))
+    return items, None
+
+
+@lru_cache(maxsize=4096)
+def parse_ingredients(text):
+    # Single pass over the text: one stack frame per open bracket, each frame holding
+    # the items finished so far, the characters of the item being read and the brackets
+    # (position in those characters, sub-ingredients, percentage) met inside that item.
+    text = _HEADING.sub("", text.lower())
+    stack = [([], [], [])]
+    for ch in text:
+        items, chars, brackets = stack[-1]
+        if ch in SEPARATORS:
+            items.extend(_finish(chars, brackets))
+            stack[-1] = (items, [], [])
+        elif ch in OPEN:
+            stack.append(([], [], []))
+        elif ch in CLOSE:
+            if len(stack) == 1:
+                continue
+            inner, percent = _close(stack.pop())
+            parent_chars = stack[-1][1]
+            stack[-1][2].append((len(parent_chars), inner, percent))
+        elif ch == "." and (not chars or not chars[-1].isdigit()):
+            continue
+        else:
+            chars.append(ch)
+
+    while len(stack) > 1:
+        inner, percent = _close(stack.pop())
+        stack[-1][2].append((len(stack[-1][1]), inner, percent))
+    items, chars, brackets = stack[0]
+    items.extend(_finish(chars, brackets))
+    return tuple(items)
+
+
+def iter_ingredients(tree):
+    for ingredient in tree:
+        yield ingredient
+        yield from iter_ingredients(ingredient.children)
@@ -0,0 +1,145 @@
+import math
+import re
+import unicodedata
+from collections import defaultdict
+
+# Alternate names (other languages, common product wording) for recipe ingredients
+SYNONYMS = {
+    "flattened rice": ["poha", "beaten rice", "aval", "rice flakes"],
+    "onion": ["onions", "oignon", "cebolla", "pyaz"],
+    "green peas": ["peas", "petits pois", "matar", "guisantes"],
+    "oil": ["vegetable oil", "sunflower oil", "cooking oil", "huile", "aceite"],
+    "olive oil": ["huile d'olive", "aceite de oliva", "olio d'oliva"],
+    "bread slices": ["bread", "sandwich bread", "toast", "pain de mie", "pan"],
+    "cheese": ["cheese slices", "fromage", "queso", "formaggio"],
+    "tomato": ["tomate", "pomodoro", "tamatar"],
+    "cucumber": ["concombre", "pepino", "kheera"],
+    "carrot": ["carotte", "zanahoria", "gajar"],
+    "beans": ["green beans", "haricots", "frijoles", "judias"],
+    "salt": ["sel", "sal", "sea salt", "iodised salt"],
+    "water": ["eau", "agua", "mineral water", "spring water"],
+    "lettuce": ["laitue", "lechuga", "iceberg"],
+    "rice": ["basmati", "riz", "arroz", "chawal"],
+    "vegetables": ["mixed vegetables", "legumes", "verduras", "sabzi"],
+    "ghee": ["clarified butter", "desi ghee"],
+    "spices": ["masala", "garam masala", "epices", "especias"],
+}
+
+# Words that describe a product rather than identify the ingredient
+STOPWORDS = frozenset([
+    "the", "a", "of", "with", "and", "in", "de", "d", "du", "des", "la", "le", "les", "el", "di",
+    "extra", "virgin", "organic", "bio", "fresh", "premium", "pure", "natural", "classic",
+    "original", "pack", "g", "kg", "ml", "l",
+])
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def _singular(token):
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 4 and token.endswith(("oes", "ses", "xes", "ches", "shes")):
+        return token[:-2]
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def normalize(text):
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return [_singular(t) for t in _NON_WORD.split(text) if t and t not in STOPWORDS and not t.isdigit()]
+
+
+def trigrams(token):
+    padded = f"#{token}#"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class IngredientMatcher:
+    # Aliases (names and synonyms) are indexed by token, and every vocabulary token by its
+    # trigrams, so a lookup only scores aliases sharing a token or near-token with the query.
+    def __init__(self, names, synonyms=SYNONYMS, threshold=0.6, fuzzy=0.5):
+        self.threshold = threshold
+        self.fuzzy = fuzzy
+        self.aliases = []
+        self.token_postings = defaultdict(set)
+        self.trigram_postings = defaultdict(set)
+        self.vocab = {}
+        self.name_aliases = defaultdict(list)
+
+        for name in dict.fromkeys(n.lower() for n in names):
+            for alias in [name] + synonyms.get(name, []):
+                self._add_alias(name, alias)
+
+        doc_freq = defaultdict(int)
+        for _, tokens in self.aliases:
+            for token in set(tokens):
+                doc_freq[token] += 1
+        total = len(self.aliases) or 1
+        self.idf = {t: math.log(1 + total / df) for t, df in doc_freq.items()}
+        self.alias_weight = [sum(self.idf[t] for t in tokens) for _, tokens in self.aliases]
+
+    def _add_alias(self, name, alias):
+        tokens = tuple(dict.fromkeys(normalize(alias)))
+        if not tokens:
+            return
+        index = len(self.aliases)
+        self.aliases.append((name, tokens))
+        self.name_aliases[name].append(index)
+        for token in tokens:
+            self.token_postings[token].add(index)
+            if token not in self.vocab:
+                self.vocab[token] = trigrams(token)
+                for gram in self.vocab[token]:
+                    self.trigram_postings[gram].add(token)
+
+    def _resolve(self, query_tokens):
+        # Maps vocabulary tokens to how well the query contains them: 1.0 exact, else trigram Jaccard
+        resolved = {}
+        for token in query_tokens:
+            if token in self.vocab:
+                resolved[token] = 1.0
+                continue
+            grams = trigrams(token)
+            hits = defaultdict(int)
+            for gram in grams:
+                for candidate in self.trigram_postings.get(gram, ()):
+                    hits[candidate] += 1
+            for candidate, shared in hits.items():
+                similarity = shared / (len(grams) + len(self.vocab[candidate]) - shared)
+                if similarity >= self.fuzzy and similarity > resolved.get(candidate, 0.0):
+                    resolved[candidate] = similarity
+        return resolved
+
+    def match(self, text, allowed=None):
+        resolved = self._resolve(set(normalize(text)))
+        if not resolved:
+            return None
+
+        covered = defaultdict(float)
+        matched = defaultdict(int)
+        if allowed is not None:
+            # A single recipe: score just its own aliases
+            for name in allowed:
+                for index in self.name_aliases.get(name, ()):
+                    for token in self.aliases[index][1]:
+                        if token in resolved:
+                            covered[index] += self.idf[token] * resolved[token]
+                            matched[index] += 1
+        else:
+            for token, similarity in resolved.items():
+                weight = self.idf[token] * similarity
+                for index in self.token_postings[token]:
+                    covered[index] += weight
+                    matched[index] += 1
+
+        best, best_key = None, (0.0, 0)
+        for index, weight in covered.items():
+            # Full coverage of a longer alias ("olive oil") beats a shorter one ("oil")
+            key = (round(weight / self.alias_weight[index], 6), matched[index])
+            if key > best_key:
+                best, best_key = index, key
+        if best is None or best_key[0] < self.threshold:
+            return None
+        return self.aliases[best][0], best_key[0]
@@ -0,0 +1,61 @@
+import numpy as np
+
+from .product import (NUTRIMENTS, ENERGY_KJ, SATURATED_FAT, SUGARS, SODIUM,
+                      FIBER, PROTEINS, FRUITS_VEGETABLES)
+
+# Nutri-Score (general foods) point thresholds; a value strictly above the n-th threshold earns n points
+ENERGY_KJ_THRESHOLDS = np.array([335, 670, 1005, 1340, 1675, 2010, 2345, 2680, 3015, 3350])
+SUGARS_THRESHOLDS = np.array([4.5, 9, 13.5, 18, 22.5, 27, 31, 36, 40, 45])
+SATURATED_FAT_THRESHOLDS = np.array([1, 2, 3, 4, 5, 6, 7, 8, 9, 10])
+SODIUM_MG_THRESHOLDS = np.array([90, 180, 270, 360, 450, 540, 630, 720, 810, 900])
+FIBER_THRESHOLDS = np.array([0.9, 1.9, 2.8, 3.7, 4.7])
+PROTEIN_THRESHOLDS = np.array([1.6, 3.2, 4.8, 6.4, 8.0])
+FRUIT_THRESHOLDS = np.array([40, 60, 80])
+FRUIT_POINTS = np.array([0, 1, 2, 5])
+
+GRADES = np.array(list("ABCDE"))
+GRADE_UPPER_BOUNDS = np.array([-1, 2, 10, 18])
+
+
+def _points(thresholds, values):
+    return np.searchsorted(thresholds, values, side="left")
+
+
+def nutri_score(nutriments):
+    # Scores one vector (len(NUTRIMENTS),) or a whole matrix (n, len(NUTRIMENTS)) at once;
+    # missing values count as 0.
+    values = np.nan_to_num(np.asarray(nutriments, dtype=np.float64), nan=0.0)
+    if values.shape[-1] != len(NUTRIMENTS):
+        raise ValueError(f"Expected {len(NUTRIMENTS)} nutriment columns, got {values.shape[-1]}")
+
+    negative = (_points(ENERGY_KJ_THRESHOLDS, values[..., ENERGY_KJ])
+                + _points(SUGARS_THRESHOLDS, values[..., SUGARS])
+                + _points(SATURATED_FAT_THRESHOLDS, values[..., SATURATED_FAT])
+                + _points(SODIUM_MG_THRESHOLDS, values[..., SODIUM] * 1000))
+    fruit = FRUIT_POINTS[_points(FRUIT_THRESHOLDS, values[..., FRUITS_VEGETABLES])]
+    fiber = _points(FIBER_THRESHOLDS, values[..., FIBER])
+    protein = _points(PROTEIN_THRESHOLDS, values[..., PROTEINS])
+
+    # Protein only counts when negative points are low or the fruit/veg share is maximal
+    counts_protein = (negative < 11) | (fruit == 5)
+    score = negative - fruit - fiber - np.where(counts_protein, protein, 0)
+    grade = GRADES[np.searchsorted(GRADE_UPPER_BOUNDS, score, side="left")]
+    return score, grade
+
+
+def score_products(products):
+    if not products:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=GRADES.dtype)
+    return nutri_score(np.stack([p.nutriments for p in products]))
+
+
+def cart_nutri_score(cart):
+    # The cart is scored as one food: its weight-averaged composition per 100 g
+    if not cart.items:
+        return None
+    matrix = np.nan_to_num(np.stack([line.product.nutriments for line in cart.items]), nan=0.0)
+    weights = np.array([line.weight for line in cart.items], dtype=np.float64)
+    if weights.sum() <= 0:
+        return None
+    score, grade = nutri_score(weights @ matrix / weights.sum())
+    return int(score), str(grade)
@@ -1,25 +1,44 @@
-import requests
 import numpy as np
 import cv2
 
+from . import off_api
+from .barcode import canonicalize_barcode
+from .ingredients import parse_ingredients
+from .product import (Product, ProductStore, parse_nutrient, nutriment_vector,
+                      FOUND, NOT_FOUND, FETCH_ERROR, INVALID, OFFLINE)
+from .resilience import Resilience, CircuitOpenError
+from .rate_limit import INTERACTIVE, search_limiter
+
 # Ingredient flags
 UNHEALTHY_INGREDIENTS = ['palm oil', 'high-fructose corn syrup', 'hydrogenated oil']
 ALLERGENS = ['gluten', 'milk', 'soy', 'egg', 'nuts', 'peanuts', 'wheat']
 SUSPICIOUS_ADDITIVES = ['e102', 'e110', 'e120', 'e124', 'e250', 'e621']
 
-def analyze_ingredients(ingredient_text):
-    ingredients = ingredient_text.lower().replace("(", "").replace(")", "").replace(".", "").split(",")
-    flagged = {"unhealthy": [], "allergens": [], "suspicious": [], "natural": []}
-    for ing in ingredients:
-        ing = ing.strip()
+def _flag(ingredients, flagged):
+    # Children are scored before their parent, and a parent is skipped once one of its
+    # children is flagged, so "hydrogenated oil (palm oil)" counts as one unhealthy item
+    any_flagged = False
+    for ingredient in ingredients:
+        if _flag(ingredient.children, flagged):
+            any_flagged = True
+            continue
+        ing = ingredient.name
         if any(x in ing for x in UNHEALTHY_INGREDIENTS):
             flagged["unhealthy"].append(ing)
         elif any(x in ing for x in ALLERGENS):
             flagged["allergens"].append(ing)
         elif any(x in ing for x in SUSPICIOUS_ADDITIVES):
             flagged["suspicious"].append(ing)
-        elif ing != '':
-            flagged["natural"].append(ing)
+        else:
+            if ing != '':
+                flagged["natural"].append(ing)
+            continue
+        any_flagged = True
+    return any_flagged
+
+def analyze_ingredients(ingredient_text):
+    flagged = {"unhealthy": [], "allergens": [], "suspicious": [], "natural": []}
+    _flag(parse_ingredients(ingredient_text), flagged)
     return flagged
 
 def calculate_health_score(ingredient_analysis):
@@ -29,35 +48,148 @@ def calculate_health_score(ingredient_analysis):
     score -= len(ingredient_analysis.get("suspicious", [])) * 10
     return max(0, min(score, 100))
 
-def get_nutrition_from_api(barcode):
+# Bit i of a mask stands for entry i of the matching flag list
+ALLERGEN_BITS = {name: 1 << i for i, name in enumerate(ALLERGENS)}
+ADDITIVE_BITS = {name: 1 << i for i, name in enumerate(SUSPICIOUS_ADDITIVES)}
+UNHEALTHY_BITS = {name: 1 << i for i, name in enumerate(UNHEALTHY_INGREDIENTS)}
+
+def mask_for(names, bits=ALLERGEN_BITS):
+    mask = 0
+    for name in names:
+        mask |= bits[name]
+    return mask
+
+def names_in_mask(mask, bits=ALLERGEN_BITS):
+    return [name for name, bit in bits.items() if mask & bit]
+
+def _text_mask(ingredient_analysis, bits):
+    mask = 0
+    for ingredients in ingredient_analysis.values():
+        for ing in ingredients:
+            for name, bit in bits.items():
+                if name in ing:
+                    mask |= bit
+    return mask
+
+def ingredient_masks(ingredient_analysis):
+    return (_text_mask(ingredient_analysis, ALLERGEN_BITS),
+            _text_mask(ingredient_analysis, ADDITIVE_BITS),
+            _text_mask(ingredient_analysis, UNHEALTHY_BITS))
+
+# Bumped whenever the flag lists change; cached analyses and scores from older versions are stale
+taxonomy_version = 0
+
+def set_taxonomy(unhealthy=None, allergens=None, additives=None):
+    global taxonomy_version
+    for names, bits, new in ((UNHEALTHY_INGREDIENTS, UNHEALTHY_BITS, unhealthy),
+                             (ALLERGENS, ALLERGEN_BITS, allergens),
+                             (SUSPICIOUS_ADDITIVES, ADDITIVE_BITS, additives)):
+        if new is None:
+            continue
+        # Updated in place so modules holding references see the new taxonomy
+        names[:] = list(new)
+        bits.clear()
+        bits.update({name: 1 << i for i, name in enumerate(names)})
+    taxonomy_version += 1
+
+def product_health_score(product):
+    # Computed once per product and taxonomy version, then a field read
+    if product.taxonomy_version != taxonomy_version:
+        if product.found and product.taxonomy_version >= 0:
+            product.ingredient_analysis = analyze_ingredients(product.ingredients)
+            product.allergen_mask, product.additive_mask, product.unhealthy_mask = \
+                ingredient_masks(product.ingredient_analysis)
+        product.health_score = calculate_health_score(product.ingredient_analysis)
+        product.taxonomy_version = taxonomy_version
+    return product.health_score
+
+def filter_products(products, exclude_allergens=0, exclude_additives=0, exclude_unhealthy=0):
+    return [p for p in products
+            if not (p.allergen_mask & exclude_allergens
+                    or p.additive_mask & exclude_additives
+                    or p.unhealthy_mask & exclude_unhealthy)]
+
+# Keyed by canonical GTIN so UPC-A/EAN-13/QR forms of one product share an entry
+product_store = ProductStore()
+# Separate breakers so failing background work never makes interactive scans fail fast
+upstream = Resilience()
+background = Resilience()
+
+
+def _resilience(priority):
+    return upstream if priority == INTERACTIVE else background
+
+def _product_from_json(code, product):
+    ingredients_text = product.get('ingredients_text', 'N/A')
+    ingredient_analysis = analyze_ingredients(ingredients_text)
+    allergen_mask, additive_mask, unhealthy_mask = ingredient_masks(ingredient_analysis)
+    info = Product(
+        barcode=code,
+        name=product.get('product_name', 'Unknown Product'),
+        nutriments=nutriment_vector(product.get('nutriments', {})),
+        ingredients=ingredients_text,
+        ingredient_analysis=ingredient_analysis,
+        allergen_mask=allergen_mask,
+        additive_mask=additive_mask,
+        unhealthy_mask=unhealthy_mask,
+        status=FOUND,
+    )
+    info.health_score = calculate_health_score(ingredient_analysis)
+    info.taxonomy_version = taxonomy_version
+    return info
+
+def get_nutrition_from_api(barcode, priority=INTERACTIVE):
+    code = canonicalize_barcode(barcode)
+    if code is None:
+        return Product.unavailable(INVALID, barcode)
+    cached = product_store.get(code)
+    if cached is not None:
+        return cached
+
     try:
-        res = requests.get(f"https://world.openfoodfacts.org/api/v0/product/{barcode}.json", timeout=5)
-        data = res.json()
+        data = _resilience(priority).call(off_api.fetch_product, code, priority)
         if data.get('status') != 1:
-            return {"name": "Product not found", "calories": "N/A", "protein": "N/A", "fat": "N/A",
-                    "ingredients": "N/A", "ingredient_analysis": {}}
-
-        product = data['product']
-        name = product.get('product_name', 'Unknown Product')
-        nutriments = product.get('nutriments', {})
-        calories = nutriments.get('energy-kcal_100g', 'N/A')
-        protein = nutriments.get('proteins_100g', 'N/A')
-        fat = nutriments.get('fat_100g', 'N/A')
-        ingredients_text = product.get('ingredients_text', 'N/A')
-        ingredient_analysis = analyze_ingredients(ingredients_text)
-
-        return {
-            "name": name,
-            "calories": f"{calories} kcal",
-            "protein": f"{protein} g",
-            "fat": f"{fat} g",
-            "ingredients": ingredients_text,
-            "ingredient_analysis": ingredient_analysis
-        }
+            info = Product.unavailable(NOT_FOUND, code)
+        else:
+            info = _product_from_json(code, data['product'])
+        return product_store.intern(info)
 
+    except CircuitOpenError:
+        # Upstream is unhealthy: answer from the cache (checked above) without waiting
+        return Product.unavailable(OFFLINE, code)
     except:
-        return {"name": "Error fetching data", "calories": "N/A", "protein": "N/A", "fat": "N/A",
-                "ingredients": "N/A", "ingredient_analysis": {}}
+        return Product.unavailable(FETCH_ERROR, code)
+
+def get_nutrition_batch(barcodes, priority=INTERACTIVE):
+    failures = {}
+    canonical = {barcode: canonicalize_barcode(barcode) for barcode in barcodes}
+    missing = list(dict.fromkeys(code for code in canonical.values()
+                                 if code is not None and code not in product_store))
+
+    if len(missing) == 1 or (missing and not search_limiter.ready()):
+        # The search quota is much smaller than the product one: spend product lookups instead
+        for code in missing:
+            failures[code] = get_nutrition_from_api(code, priority).status
+    elif missing:
+        # One search request for every code that showed up in the same frame
+        try:
+            data = _resilience(priority).call(off_api.search_products, missing, priority)
+            found = {canonicalize_barcode(p.get('code', '')): p for p in data.get('products', [])}
+            for code in missing:
+                product_store.intern(_product_from_json(code, found[code]) if code in found
+                                     else Product.unavailable(NOT_FOUND, code))
+        except CircuitOpenError:
+            failures = dict.fromkeys(missing, OFFLINE)
+        except:
+            pass
+
+    results = {}
+    for barcode, code in canonical.items():
+        if code is None:
+            results[barcode] = Product.unavailable(INVALID, barcode)
+        else:
+            results[barcode] = product_store.get(code) or Product.unavailable(failures.get(code, FETCH_ERROR), code)
+    return results
 
 def draw_circular_meter(frame, box_points, score):
     pts = np.array([(point.x, point.y) for point in box_points], np.int32)
@@ -84,7 +216,5 @@ def draw_circular_meter(frame, box_points, score):
                 cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
 
 def safe_float(val):
-    try:
-        return float(str(val).split()[0])
-    except:
-        return 0.0
\ No newline at end of file
+    value = parse_nutrient(val)
+    return value if value is not None else 0.0
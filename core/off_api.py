@@ -0,0 +1,104 @@
+import json
+import os
+import time
+from collections import deque, namedtuple
+
+import numpy as np
+import requests
+
+from .rate_limit import limiter, search_limiter, INTERACTIVE, BULK
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Point at a mirror or tools/fake_off_server.py with OFF_BASE_URL=http://127.0.0.1:8080
+BASE_URL = os.environ.get("OFF_BASE_URL", "https://world.openfoodfacts.org")
+# The only product fields the app reads; everything else in a product document is dead weight
+PRODUCT_FIELDS = ("code", "product_name", "nutriments", "ingredients_text")
+HEADERS = {"Accept-Encoding": "gzip, deflate", "User-Agent": "HealthyCartChallenge/1.0"}
+TIMEOUT = 5
+
+LookupStat = namedtuple("LookupStat", ["endpoint", "wire_bytes", "payload_bytes", "parse_ms"])
+
+session = requests.Session()
+session.headers.update(HEADERS)
+
+
+def loads(data):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+class LookupStats:
+    def __init__(self, size=256):
+        self.recent = deque(maxlen=size)
+        self.count = 0
+
+    def record(self, stat):
+        self.recent.append(stat)
+        self.count += 1
+
+    def summary(self):
+        if not self.recent:
+            return {"lookups": self.count}
+        parse = np.array([s.parse_ms for s in self.recent])
+        return {
+            "lookups": self.count,
+            "mean_wire_bytes": float(np.mean([s.wire_bytes for s in self.recent])),
+            "mean_payload_bytes": float(np.mean([s.payload_bytes for s in self.recent])),
+            "mean_parse_ms": float(parse.mean()),
+            "p95_parse_ms": float(np.percentile(parse, 95)),
+        }
+
+
+lookup_stats = LookupStats()
+
+
+def _wire_bytes(res):
+    # Bytes actually received, before gzip decoding, when urllib3 can tell
+    try:
+        return int(res.raw.tell()) or len(res.content)
+    except (AttributeError, TypeError, ValueError):
+        return len(res.content)
+
+
+def set_base_url(url):
+    global BASE_URL
+    BASE_URL = url.rstrip("/")
+
+
+def get_json(path, params=None, decoder=loads, endpoint=None, timeout=TIMEOUT, priority=INTERACTIVE,
+             bucket=limiter):
+    waited = bucket.acquire(priority, timeout)
+    res = session.get(BASE_URL + path, params=params, timeout=max(timeout - waited, 0.05))
+    # A missing product still comes back as a JSON document (404, status 0)
+    if res.status_code >= 500 or res.status_code == 429:
+        res.raise_for_status()
+    payload = res.content
+    start = time.perf_counter()
+    data = decoder(payload)
+    lookup_stats.record(LookupStat(endpoint or path, _wire_bytes(res), len(payload),
+                                   (time.perf_counter() - start) * 1000))
+    return data
+
+
+def fetch_product(code, priority=INTERACTIVE, timeout=TIMEOUT):
+    return get_json(f"/api/v2/product/{code}", {"fields": ",".join(PRODUCT_FIELDS)},
+                    endpoint="product", timeout=timeout, priority=priority)
+
+
+def search_products(codes, priority=INTERACTIVE, timeout=TIMEOUT):
+    return get_json("/api/v2/search", {"code": ",".join(codes), "fields": ",".join(PRODUCT_FIELDS),
+                                       "page_size": len(codes)},
+                    endpoint="search", timeout=timeout, priority=priority, bucket=search_limiter)
+
+
+def compare_projection(code):
+    # Full v0 document parsed with the stdlib against the projected v2 lookup
+    get_json(f"/api/v0/product/{code}.json", decoder=json.loads, endpoint="v0 product", priority=BULK)
+    full = lookup_stats.recent[-1]
+    fetch_product(code, BULK)
+    projected = lookup_stats.recent[-1]
+    return {field: (getattr(full, field), getattr(projected, field))
+            for field in ("wire_bytes", "payload_bytes", "parse_ms")}
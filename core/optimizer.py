@@ -0,0 +1,186 @@
+import itertools
+import math
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from .cart_matrix import CartMatrix, NUTRIENTS
+from .nutrition import ALLERGENS
+
+Suggestion = namedtuple("Suggestion", ["products", "weights", "score", "passed", "elapsed_ms"])
+
+EXHAUSTIVE_LIMIT = 8  # enumerate every challenge subset up to this many challenges
+
+
+def _bounds(matrix, subset):
+    lo = np.full(len(NUTRIENTS), -math.inf)
+    hi = np.full(len(NUTRIENTS), math.inf)
+    count_lo, count_hi = 0, math.inf
+    allowed = np.ones(len(matrix), dtype=bool)
+    for challenge in subset:
+        for rule in challenge.rules:
+            rlo, rhi = rule.bounds()
+            if rule.key in NUTRIENTS:
+                k = NUTRIENTS.index(rule.key)
+                lo[k], hi[k] = max(lo[k], rlo), min(hi[k], rhi)
+            elif rule.key == "items":
+                count_lo, count_hi = max(count_lo, rlo), min(count_hi, rhi)
+            elif rule.key.startswith("allergen:") and rhi < 1:
+                allowed &= ~matrix.allergens[:, ALLERGENS.index(rule.key.split(":", 1)[1])]
+    return lo, hi, count_lo, count_hi, allowed
+
+
+def _solve_subset(matrix, subset, min_weight, max_weight):
+    # Greedy bounded search: every allowed product at min_weight, drop products to satisfy
+    # upper bounds, then raise the most efficient weights until the lower bounds are met.
+    lo, hi, count_lo, count_hi, allowed = _bounds(matrix, subset)
+    if (lo > hi).any() or count_lo > count_hi:
+        return None
+    # Aim just inside each bound so float rounding cannot leave a total a hair outside it
+    scale = np.where(np.isfinite(lo), np.abs(lo), np.where(np.isfinite(hi), np.abs(hi), 1.0))
+    margin = 1e-6 * np.maximum(scale, 1.0)
+    lo, hi = lo + margin, np.maximum(hi - margin, lo + margin)
+
+    # Normalizes violations so the relatively worst bound is fixed first
+    hi_scale = np.where(np.isfinite(hi), np.maximum(np.abs(hi), 1.0), 1.0)
+    lo_scale = np.where(np.isfinite(lo), np.maximum(np.abs(lo), 1.0), 1.0)
+    per_gram = matrix.per100g / 100.0
+    health = matrix.health
+    w = np.where(allowed, min_weight, 0.0)
+    totals = w @ per_gram
+
+    while True:
+        over = totals - hi
+        if not (over > 1e-9).any():
+            break
+        k = int(np.argmax(over / hi_scale))
+        contrib = per_gram[:, k] * w
+        ratio = np.where(contrib > 0, health / np.where(contrib > 0, contrib, 1.0), np.inf)
+        i = int(np.argmin(ratio))
+        if not np.isfinite(ratio[i]):
+            return None
+        totals -= w[i] * per_gram[i]
+        w[i] = 0.0
+
+    included = w > 0
+    if included.sum() > count_hi:
+        order = np.argsort(np.where(included, health, np.inf))
+        for i in order[:int(included.sum() - count_hi)]:
+            totals -= w[i] * per_gram[i]
+            w[i] = 0.0
+        included = w > 0
+
+    for _ in range(2 * len(matrix) + len(NUTRIENTS)):
+        deficit = lo - totals
+        if not (deficit > 1e-9).any():
+            break
+        k = int(np.argmax(deficit / lo_scale))
+        slack = hi - totals
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cap_room = np.where(per_gram > 0, slack / per_gram, np.inf).min(axis=1)
+            pressure = np.where(np.isfinite(slack), per_gram / np.maximum(slack, 1e-9), 0.0).sum(axis=1)
+        room = np.minimum(max_weight - w, cap_room)
+        addable = allowed & ~included & (room >= min_weight) & (included.sum() < count_hi)
+        room = np.where(included | addable, room, 0.0)
+        useful = (per_gram[:, k] > 0) & (room > 1e-9)
+        if not useful.any():
+            return None
+        efficiency = np.where(useful, (per_gram[:, k] / deficit[k]) / (pressure + 1e-9), -np.inf)
+        i = int(np.argmax(efficiency))
+        add = min(room[i], deficit[k] / per_gram[i, k])
+        if not included[i]:
+            add = max(add, min_weight)
+        w[i] += add
+        totals += add * per_gram[i]
+        included[i] = True
+    else:
+        return None
+
+    if included.sum() < count_lo:
+        spare = allowed & ~included
+        for i in np.argsort(-np.where(spare, health, -np.inf)):
+            if included.sum() >= count_lo or not spare[i]:
+                break
+            if ((totals + min_weight * per_gram[i]) <= hi + 1e-9).all():
+                w[i] = min_weight
+                totals += min_weight * per_gram[i]
+                included[i] = True
+        if included.sum() < count_lo:
+            return None
+    return w
+
+
+def _subsets(challenges):
+    if len(challenges) <= EXHAUSTIVE_LIMIT:
+        subsets = [combo for r in range(len(challenges), -1, -1)
+                   for combo in itertools.combinations(challenges, r)]
+    else:
+        # Too many challenges to enumerate: grow one subset greedily by bonus
+        ranked = sorted(challenges, key=lambda c: -c.bonus)
+        subsets = [tuple(ranked[:r]) for r in range(len(ranked), -1, -1)]
+    return sorted(subsets, key=lambda s: -sum(c.bonus for c in s))
+
+
+def optimize_matrix(matrix, min_weight=10.0, max_weight=500.0, time_budget_ms=40.0):
+    # Challenges are soft: passing them outranks any health score, so a cart that fails
+    # every challenge is only suggested when no challenge subset is feasible at all.
+    # Solutions are compared by (bonus of the challenges they pass, game_score).
+    start = time.perf_counter()
+    deadline = start + time_budget_ms / 1000.0
+
+    best_w, best_key = None, (-math.inf, -math.inf)
+    for subset in _subsets(matrix.ruleset.challenges):
+        if sum(c.bonus for c in subset) < best_key[0]:
+            break  # subsets come sorted by bonus, none of the rest can pass more
+        w = _solve_subset(matrix, subset, min_weight, max_weight)
+        if w is not None:
+            passed = matrix.challenges(w)
+            bonus = sum(c.bonus for c in matrix.ruleset.challenges if passed[c.key])
+            key = (bonus, float(matrix.game_score(w)))
+            if key > best_key:
+                best_w, best_key = w, key
+        if time.perf_counter() > deadline and best_w is not None:
+            break
+    best_score = best_key[1]
+
+    if best_w is None:
+        best_w = np.zeros(len(matrix))
+        best_score = float(matrix.game_score(best_w))
+    passed = {key: bool(ok) for key, ok in matrix.challenges(best_w).items()}
+    return best_w, best_score, passed, (time.perf_counter() - start) * 1000
+
+
+def suggest_weights(cart, min_weight=10.0, max_weight=500.0, time_budget_ms=40.0):
+    products = list({line.product.barcode: line.product for line in cart.items}.values())
+    matrix = CartMatrix.from_products(products, np.zeros(len(products)), cart.ruleset)
+    w, score, passed, elapsed = optimize_matrix(matrix, min_weight, max_weight, time_budget_ms)
+    return Suggestion(products, [float(x) for x in w], score, passed, elapsed)
+
+
+def random_matrix(n, seed=0):
+    rng = np.random.default_rng(seed)
+    per100g = np.column_stack([
+        rng.uniform(20, 600, n),
+        rng.uniform(0, 35, n),
+        rng.uniform(0, 40, n),
+    ])
+    health = rng.choice([40, 60, 80, 90, 100], n).astype(np.float64)
+    allergens = rng.random((n, len(ALLERGENS))) < 0.1
+    return CartMatrix(per100g, health, np.zeros(n), allergens=allergens)
+
+
+def benchmark_optimizer(sizes=(10, 50, 100, 300), repeats=5):
+    report = {}
+    for n in sizes:
+        latencies = []
+        for seed in range(repeats):
+            matrix = random_matrix(n, seed)
+            latencies.append(optimize_matrix(matrix)[3])
+        report[n] = {"p50_ms": float(np.median(latencies)), "max_ms": float(np.max(latencies))}
+    return report
+
+
+if __name__ == "__main__":
+    for n, stats in benchmark_optimizer().items():
+        print(f"{n:>4} products: p50 {stats['p50_ms']:.2f} ms, max {stats['max_ms']:.2f} ms")
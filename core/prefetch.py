@@ -0,0 +1,112 @@
+import json
+import os
+import queue
+import threading
+from collections import defaultdict
+
+from .nutrition import get_nutrition_batch, product_store
+from .rate_limit import PREFETCH
+
+HISTORY_PATH = "scan_history.json"
+
+
+class ScanHistory:
+    # How often each barcode was scanned for an ingredient (lowercased name), across sessions
+    def __init__(self, path=HISTORY_PATH):
+        self.path = path
+        self.counts = defaultdict(lambda: defaultdict(int))
+        self.lock = threading.Lock()
+        self.dirty = False
+        try:
+            with open(path, encoding="utf-8") as f:
+                for ingredient, barcodes in json.load(f).items():
+                    self.counts[ingredient].update(barcodes)
+        except (OSError, ValueError):
+            pass
+
+    def record(self, ingredient, barcode):
+        with self.lock:
+            self.counts[ingredient.lower()][barcode] += 1
+            self.dirty = True
+
+    def top(self, ingredient, n=3):
+        with self.lock:
+            barcodes = self.counts.get(ingredient.lower(), {})
+            return sorted(barcodes, key=barcodes.get, reverse=True)[:n]
+
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            data = {ing: dict(barcodes) for ing, barcodes in self.counts.items()}
+            self.dirty = False
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)
+
+
+class InteractiveGate:
+    # Counts lookups a user is waiting on; background work only runs while it is idle
+    def __init__(self):
+        self.active = 0
+        self.idle = threading.Condition()
+
+    def __enter__(self):
+        with self.idle:
+            self.active += 1
+        return self
+
+    def __exit__(self, *exc):
+        with self.idle:
+            self.active -= 1
+            if self.active == 0:
+                self.idle.notify_all()
+
+    def wait_idle(self, timeout=None):
+        with self.idle:
+            return self.idle.wait_for(lambda: self.active == 0, timeout)
+
+
+class Prefetcher:
+    # One daemon thread warms product_store with the barcodes most often scanned for a
+    # recipe's ingredients, a small batch at a time and only between interactive lookups.
+    # Selecting another recipe drops whatever is still queued for the previous one.
+    def __init__(self, history=None, gate=None, per_ingredient=3, batch_size=10):
+        self.history = history if history is not None else ScanHistory()
+        self.gate = gate if gate is not None else InteractiveGate()
+        self.per_ingredient = per_ingredient
+        self.batch_size = batch_size
+        self.jobs = queue.Queue()
+        self.generation = 0
+        self.warmed = 0
+        self.thread = None
+
+    def warm(self, ingredients):
+        codes = []
+        for ingredient in ingredients:
+            codes.extend(self.history.top(ingredient, self.per_ingredient))
+        codes = [code for code in dict.fromkeys(codes) if code not in product_store]
+        self.generation += 1
+        if not codes:
+            return 0
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+        for start in range(0, len(codes), self.batch_size):
+            self.jobs.put((self.generation, codes[start:start + self.batch_size]))
+        return len(codes)
+
+    def _run(self):
+        while True:
+            generation, codes = self.jobs.get()
+            if generation != self.generation:
+                continue
+            self.gate.wait_idle()
+            codes = [code for code in codes if code not in product_store]
+            if codes:
+                get_nutrition_batch(codes, PREFETCH)
+                self.warmed += len(codes)
+
+
+prefetcher = Prefetcher()
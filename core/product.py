@@ -0,0 +1,132 @@
+import math
+
+import numpy as np
+
+FOUND = "found"
+NOT_FOUND = "not_found"
+FETCH_ERROR = "error"
+INVALID = "invalid"
+OFFLINE = "offline"
+
+STATUS_NAMES = {
+    NOT_FOUND: "Product not found",
+    FETCH_ERROR: "Error fetching data",
+    INVALID: "Invalid barcode",
+    OFFLINE: "Offline, try again shortly",
+}
+
+
+# Fixed per-100 g layout of Product.nutriments (Open Food Facts "<name>_100g" keys); NaN = missing
+NUTRIMENTS = ("energy-kcal", "energy-kj", "proteins", "fat", "saturated-fat", "carbohydrates",
+              "sugars", "fiber", "salt", "sodium", "fruits-vegetables-nuts-estimate-from-ingredients")
+(ENERGY_KCAL, ENERGY_KJ, PROTEINS, FAT, SATURATED_FAT, CARBOHYDRATES,
+ SUGARS, FIBER, SALT, SODIUM, FRUITS_VEGETABLES) = range(len(NUTRIMENTS))
+
+
+def parse_nutrient(val):
+    if val is None or val == '':
+        return None
+    try:
+        return float(str(val).split()[0])
+    except (ValueError, IndexError):
+        return None
+
+
+def nutriment_vector(nutriments):
+    vector = np.full(len(NUTRIMENTS), np.nan)
+    for i, name in enumerate(NUTRIMENTS):
+        value = parse_nutrient(nutriments.get(f"{name}_100g"))
+        if value is not None:
+            vector[i] = value
+    # Fill the pairs Open Food Facts often reports only one side of
+    if np.isnan(vector[ENERGY_KJ]) and not np.isnan(vector[ENERGY_KCAL]):
+        vector[ENERGY_KJ] = vector[ENERGY_KCAL] * 4.184
+    if np.isnan(vector[ENERGY_KCAL]) and not np.isnan(vector[ENERGY_KJ]):
+        vector[ENERGY_KCAL] = vector[ENERGY_KJ] / 4.184
+    if np.isnan(vector[SODIUM]) and not np.isnan(vector[SALT]):
+        vector[SODIUM] = vector[SALT] / 2.5
+    if np.isnan(vector[SALT]) and not np.isnan(vector[SODIUM]):
+        vector[SALT] = vector[SODIUM] * 2.5
+    return vector
+
+
+def format_nutrient(value, unit, present=True):
+    if not present:
+        return "N/A"
+    return f"{value:.2f}".rstrip("0").rstrip(".") + f" {unit}"
+
+
+class Product:
+    __slots__ = ("barcode", "name", "status", "ingredients", "ingredient_analysis",
+                 "calories", "protein", "fat", "has_calories", "has_protein", "has_fat", "nutriments",
+                 "allergen_mask", "additive_mask", "unhealthy_mask", "health_score", "taxonomy_version")
+
+    def __init__(self, barcode="", name="", calories=None, protein=None, fat=None,
+                 ingredients="N/A", ingredient_analysis=None, status=FOUND, nutriments=None,
+                 allergen_mask=0, additive_mask=0, unhealthy_mask=0):
+        self.barcode = barcode
+        self.name = name or STATUS_NAMES.get(status, "Unknown Product")
+        self.status = status
+        self.ingredients = ingredients
+        self.ingredient_analysis = ingredient_analysis if ingredient_analysis is not None else {}
+        # Bitsets over the flag lists in core.nutrition, for single-operation dietary filters
+        self.allergen_mask = allergen_mask
+        self.additive_mask = additive_mask
+        self.unhealthy_mask = unhealthy_mask
+        # Memoized by core.nutrition.product_health_score; -1 means never scored
+        self.health_score = 0
+        self.taxonomy_version = -1
+        if nutriments is None:
+            nutriments = np.full(len(NUTRIMENTS), np.nan)
+            for i, value in ((ENERGY_KCAL, calories), (PROTEINS, protein), (FAT, fat)):
+                if value is not None:
+                    nutriments[i] = value
+        else:
+            calories, protein, fat = (None if math.isnan(nutriments[i]) else float(nutriments[i])
+                                      for i in (ENERGY_KCAL, PROTEINS, FAT))
+        self.nutriments = nutriments
+        # Hot-path copies of the vector; missing values read as 0.0 and are flagged for display
+        self.has_calories = calories is not None
+        self.has_protein = protein is not None
+        self.has_fat = fat is not None
+        self.calories = float(calories) if calories is not None else 0.0
+        self.protein = float(protein) if protein is not None else 0.0
+        self.fat = float(fat) if fat is not None else 0.0
+
+    @classmethod
+    def unavailable(cls, status, barcode=""):
+        return cls(barcode=barcode, status=status)
+
+    @property
+    def found(self):
+        return self.status == FOUND
+
+    def calories_text(self):
+        return format_nutrient(self.calories, "kcal", self.has_calories)
+
+    def protein_text(self):
+        return format_nutrient(self.protein, "g", self.has_protein)
+
+    def fat_text(self):
+        return format_nutrient(self.fat, "g", self.has_fat)
+
+
+class ProductStore:
+    # One shared Product per barcode; cart lines and scanners hold references into it
+    def __init__(self):
+        self._products = {}
+
+    def get(self, barcode):
+        return self._products.get(barcode)
+
+    def intern(self, product):
+        return self._products.setdefault(product.barcode, product)
+
+    def __contains__(self, barcode):
+        return barcode in self._products
+
+    def __len__(self):
+        return len(self._products)
+
+    def clear(self):
+        self._products.clear()
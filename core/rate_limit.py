@@ -0,0 +1,99 @@
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+INTERACTIVE, PREFETCH, BULK = range(3)
+PRIORITY_NAMES = ("interactive", "prefetch", "bulk")
+
+
+class RateLimitTimeout(Exception):
+    pass
+
+
+class PriorityRateLimiter:
+    # Token bucket shared by every outbound request to one endpoint class. Waiters queue
+    # by (priority, arrival) and only the head of the queue may take a token, so a scan
+    # that arrives behind a prefetch backlog is served first; lower classes get whatever
+    # capacity is left.
+    def __init__(self, rate=100 / 60, burst=10, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.tokens = float(burst)
+        self.updated = clock()
+        self.cond = threading.Condition()
+        self.waiting = []
+        self.seq = itertools.count()
+        self.depth = [0] * len(PRIORITY_NAMES)
+        self.granted = [0] * len(PRIORITY_NAMES)
+        self.timeouts = [0] * len(PRIORITY_NAMES)
+        self.waits = [deque(maxlen=256) for _ in PRIORITY_NAMES]
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def ready(self):
+        # True when a request could go out right now without queueing
+        with self.cond:
+            self._refill()
+            return self.tokens >= 1 and not self.waiting
+
+    def acquire(self, priority=INTERACTIVE, timeout=None):
+        # Blocks until this request may go out; returns the seconds spent waiting
+        start = self.clock()
+        deadline = None if timeout is None else start + timeout
+        with self.cond:
+            ticket = (priority, next(self.seq))
+            heapq.heappush(self.waiting, ticket)
+            self.depth[priority] += 1
+            try:
+                while True:
+                    self._refill()
+                    head = self.waiting[0] == ticket
+                    if head and self.tokens >= 1:
+                        self.tokens -= 1
+                        heapq.heappop(self.waiting)
+                        self.cond.notify_all()
+                        break
+                    wait = (1 - self.tokens) / self.rate if head else None
+                    if deadline is not None:
+                        remaining = deadline - self.clock()
+                        if remaining <= 0:
+                            self.waiting.remove(ticket)
+                            heapq.heapify(self.waiting)
+                            self.cond.notify_all()
+                            self.timeouts[priority] += 1
+                            raise RateLimitTimeout(f"no request slot within {timeout:.2f}s")
+                        wait = remaining if wait is None else min(wait, remaining)
+                    self.cond.wait(wait)
+            finally:
+                self.depth[priority] -= 1
+            waited = self.clock() - start
+            self.granted[priority] += 1
+            self.waits[priority].append(waited)
+        return waited
+
+    def stats(self):
+        with self.cond:
+            report = {"tokens": self.tokens}
+            for priority, name in enumerate(PRIORITY_NAMES):
+                waits = np.array(self.waits[priority]) * 1000
+                report[name] = {
+                    "queue_depth": self.depth[priority],
+                    "granted": self.granted[priority],
+                    "timeouts": self.timeouts[priority],
+                    "mean_wait_ms": float(waits.mean()) if len(waits) else 0.0,
+                    "p95_wait_ms": float(np.percentile(waits, 95)) if len(waits) else 0.0,
+                }
+            return report
+
+
+# Open Food Facts allows about 100 product reads but only 10 search queries per minute
+limiter = PriorityRateLimiter()
+search_limiter = PriorityRateLimiter(rate=10 / 60, burst=2)
@@ -0,0 +1,105 @@
+import math
+import time
+
+import numpy as np
+
+from .nutriscore import nutri_score
+from .product import NUTRIMENTS, ENERGY_KCAL, PROTEINS, FAT
+
+SORT_KEYS = ("health", "protein", "calories", "catalog")
+
+
+class RecipeRanker:
+    # Recipe x nutrient matrix of a whole catalog with the derived ranking columns computed
+    # once, so a query is a handful of vectorized comparisons plus a top-k partition.
+    def __init__(self, nutrients, grams, coverage):
+        self.nutrients = np.asarray(nutrients, dtype=np.float64).reshape(-1, len(NUTRIMENTS))
+        self.grams = np.asarray(grams, dtype=np.float64)
+        self.known = np.asarray(coverage, dtype=np.float64) > 0
+
+        per100g = self.nutrients / np.where(self.grams > 0, self.grams, 1.0)[:, None] * 100.0
+        score, grade = nutri_score(per100g)
+        self.nutri_score = np.where(self.known, score, np.iinfo(np.int64).max)
+        self.grade = grade
+        self.calories = self.nutrients[:, ENERGY_KCAL]
+        self.protein = self.nutrients[:, PROTEINS]
+        self.fat = self.nutrients[:, FAT]
+
+    @classmethod
+    def from_store(cls, store):
+        return cls(store.nutrients, store.grams, [r.coverage for r in store.recipes])
+
+    def __len__(self):
+        return len(self.grams)
+
+    def _sort_key(self, sort):
+        # Smaller is better; recipes without nutrition sort last
+        if sort == "health":
+            return self.nutri_score
+        if sort == "protein":
+            return np.where(self.known, -self.protein, math.inf)
+        if sort == "calories":
+            return np.where(self.known, self.calories, math.inf)
+        if sort == "catalog":
+            return None
+        raise ValueError(f"Unknown sort key: {sort}")
+
+    def query(self, max_kcal=math.inf, min_protein=0.0, max_fat=math.inf, sort="health", k=None, rows=None):
+        mask = np.ones(len(self), dtype=bool)
+        if math.isfinite(max_kcal) or min_protein > 0 or math.isfinite(max_fat):
+            mask = self.known & (self.calories <= max_kcal) & (self.protein >= min_protein) & (self.fat <= max_fat)
+        if rows is not None:
+            # Restricts to e.g. the current text search result
+            restrict = np.zeros(len(self), dtype=bool)
+            restrict[np.asarray(rows, dtype=np.int64)] = True
+            mask &= restrict
+        candidates = np.flatnonzero(mask)
+
+        key = self._sort_key(sort)
+        if key is None:
+            return candidates[:k].tolist() if k is not None else candidates.tolist()
+        values = key[candidates]
+        if k is not None and k < len(candidates):
+            top = np.argpartition(values, k)[:k]
+            candidates, values = candidates[top], values[top]
+        # Stable on catalog order among equal keys
+        return candidates[np.lexsort((candidates, values))].tolist()
+
+
+def random_ranker(n, seed=0):
+    rng = np.random.default_rng(seed)
+    grams = rng.uniform(150, 600, n)
+    per100g = np.column_stack([
+        rng.uniform(20, 400, n),      # energy-kcal
+        np.zeros(n),                  # energy-kj, filled below
+        rng.uniform(0, 30, n),        # proteins
+        rng.uniform(0, 30, n),        # fat
+        rng.uniform(0, 12, n),        # saturated-fat
+        rng.uniform(0, 70, n),        # carbohydrates
+        rng.uniform(0, 30, n),        # sugars
+        rng.uniform(0, 8, n),         # fiber
+        rng.uniform(0, 2.5, n),       # salt
+        rng.uniform(0, 1, n),         # sodium
+        rng.uniform(0, 100, n),       # fruits-vegetables-nuts
+    ])
+    per100g[:, 1] = per100g[:, 0] * 4.184
+    per100g[:, 9] = per100g[:, 8] / 2.5
+    return RecipeRanker(per100g * grams[:, None] / 100.0, grams, np.ones(n))
+
+
+def benchmark_ranking(sizes=(1000, 10000, 100000), repeats=20, k=50):
+    report = {}
+    for n in sizes:
+        ranker = random_ranker(n)
+        latencies = []
+        for i in range(repeats):
+            start = time.perf_counter()
+            ranker.query(max_kcal=500 + 25 * i, min_protein=25, sort="health", k=k)
+            latencies.append((time.perf_counter() - start) * 1000)
+        report[n] = {"p50_ms": float(np.median(latencies)), "max_ms": float(np.max(latencies))}
+    return report
+
+
+if __name__ == "__main__":
+    for n, stats in benchmark_ranking().items():
+        print(f"{n:>6} recipes: p50 {stats['p50_ms']:.2f} ms, max {stats['max_ms']:.2f} ms")
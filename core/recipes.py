@@ -0,0 +1,171 @@
+import bisect
+import json
+import random
+import re
+import time
+import unicodedata
+from collections import defaultdict
+
+import numpy as np
+
+from .matcher import IngredientMatcher
+from .product import NUTRIMENTS, nutriment_vector
+from .units import to_grams
+
+RECIPES_PATH = "assets/recipes.json"
+# Per-100 g nutriments of generic ingredients, keyed like Open Food Facts "<name>_100g"
+REFERENCE_PATH = "assets/ingredient_reference.json"
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def tokenize(text):
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return [t for t in _NON_WORD.split(text) if t]
+
+
+class Recipe:
+    __slots__ = ("name", "region", "ingredients", "nutrients", "grams", "coverage")
+
+    def __init__(self, name, ingredients, region=""):
+        self.name = name
+        self.region = region
+        self.ingredients = [(ing, amount) for ing, amount in ingredients]
+        # Whole-recipe totals in the NUTRIMENTS layout; set by RecipeStore from the reference table
+        self.nutrients = np.zeros(len(NUTRIMENTS))
+        self.grams = 0.0
+        self.coverage = 0.0
+
+
+def load_reference(path=REFERENCE_PATH):
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return {name.lower(): np.nan_to_num(nutriment_vector(values), nan=0.0) for name, values in data.items()}
+
+
+def precompute_nutrition(recipes, reference):
+    # Fills every recipe's totals and returns them stacked as a (recipes x NUTRIMENTS) matrix.
+    # Ingredients without a reference entry or a readable amount only lower the coverage.
+    matcher = IngredientMatcher(reference)
+    resolved = {}
+    nutrients = np.zeros((len(recipes), len(NUTRIMENTS)))
+    grams = np.zeros(len(recipes))
+    for i, recipe in enumerate(recipes):
+        known = 0
+        for ingredient, amount in recipe.ingredients:
+            key = ingredient.lower()
+            if key not in resolved:
+                match = matcher.match(key) if key not in reference else (key, 1.0)
+                resolved[key] = match[0] if match else None
+            if resolved[key] is None:
+                continue
+            weight = to_grams(resolved[key], amount)
+            if weight is None:
+                continue
+            nutrients[i] += reference[resolved[key]] * (weight / 100.0)
+            grams[i] += weight
+            known += 1
+        recipe.nutrients = nutrients[i]
+        recipe.grams = float(grams[i])
+        recipe.coverage = known / len(recipe.ingredients) if recipe.ingredients else 0.0
+    return nutrients, grams
+
+
+class RecipeStore:
+    # Recipes are indexed by every token of their name, region and ingredient names. The
+    # sorted vocabulary turns a typed prefix into a contiguous token range, and a query
+    # that extends the previous one only narrows the previous result.
+    def __init__(self, recipes=(), reference=None):
+        self.recipes = list(recipes)
+        self.by_name = {r.name: i for i, r in enumerate(self.recipes)}
+        postings = defaultdict(set)
+        self.tokens = []
+        for i, recipe in enumerate(self.recipes):
+            words = tokenize(" ".join([recipe.name, recipe.region] + [ing for ing, _ in recipe.ingredients]))
+            self.tokens.append(frozenset(words))
+            for word in words:
+                postings[word].add(i)
+        self.vocab = sorted(postings)
+        self.postings = [postings[word] for word in self.vocab]
+        self._last = ((), list(range(len(self.recipes))))
+        self.nutrients, self.grams = precompute_nutrition(self.recipes, reference or {})
+
+    @classmethod
+    def load(cls, path=RECIPES_PATH, reference_path=REFERENCE_PATH):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        recipes = [Recipe(d["name"], d["ingredients"], d.get("region", "")) for d in data]
+        return cls(recipes, load_reference(reference_path))
+
+    def __len__(self):
+        return len(self.recipes)
+
+    def __getitem__(self, index):
+        return self.recipes[index]
+
+    def get(self, name):
+        index = self.by_name.get(name)
+        return None if index is None else self.recipes[index]
+
+    def _prefix(self, prefix):
+        lo = bisect.bisect_left(self.vocab, prefix)
+        hi = bisect.bisect_left(self.vocab, prefix + "\uffff", lo)
+        if hi - lo == 1:
+            return self.postings[lo]
+        return set().union(*self.postings[lo:hi])
+
+    def _has_prefix(self, index, prefix):
+        return any(word.startswith(prefix) for word in self.tokens[index])
+
+    def search(self, query):
+        # Indices (catalog order) of recipes where every query word prefixes one of their words
+        words = tuple(tokenize(query))
+        if not words:
+            return list(range(len(self.recipes)))
+
+        last_words, last_result = self._last
+        if last_words and len(words) >= len(last_words) and \
+                all(w.startswith(lw) for w, lw in zip(words, last_words)):
+            result = [i for i in last_result if all(self._has_prefix(i, w) for w in words)]
+        else:
+            hits = None
+            for word in sorted(words, key=len, reverse=True):
+                found = self._prefix(word)
+                hits = set(found) if hits is None else hits & found
+                if not hits:
+                    break
+            result = sorted(hits)
+        self._last = (words, result)
+        return result
+
+
+def synthetic_catalog(count, seed=0):
+    rng = random.Random(seed)
+    regions = ["Punjab", "Kerala", "Bengal", "Gujarat", "Tuscany", "Provence", "Oaxaca", "Sichuan", "Levant"]
+    dishes = ["curry", "stew", "salad", "soup", "pilaf", "flatbread", "dal", "biryani", "gratin", "tacos"]
+    ingredients = ["rice", "onion", "tomato", "lentils", "chickpeas", "spinach", "paneer", "potato",
+                   "garlic", "ginger", "olive oil", "ghee", "yogurt", "coriander", "cumin", "beans"]
+    recipes = []
+    for i in range(count):
+        region = rng.choice(regions)
+        chosen = rng.sample(ingredients, 4)
+        name = f"{region} {chosen[0]} {rng.choice(dishes)} {i}"
+        recipes.append(Recipe(name, [(ing, f"{rng.randint(1, 20) * 10}g") for ing in chosen], region))
+    return RecipeStore(recipes)
+
+
+def benchmark_search(count=10000, query="kerala spinach curry"):
+    store = synthetic_catalog(count)
+    latencies = []
+    # Simulates typing the query one keystroke at a time, then deleting it again
+    steps = [query[:n] for n in range(1, len(query) + 1)]
+    for text in steps + steps[::-1]:
+        start = time.perf_counter()
+        store.search(text)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {"recipes": len(store), "max_ms": max(latencies), "mean_ms": sum(latencies) / len(latencies)}
+
+
+if __name__ == "__main__":
+    print(benchmark_search())
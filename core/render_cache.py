@@ -0,0 +1,29 @@
+from collections import OrderedDict
+
+
+def product_version(product):
+    # A product's rendered view only changes with its lookup status and taxonomy-dependent analysis
+    return product.barcode, product.status, product.taxonomy_version
+
+
+class RenderCache:
+    # Least-recently-used cache of rendered views (HTML, label texts) keyed by product version
+    def __init__(self, maxsize=64):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, render):
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+        self.misses += 1
+        value = self.entries[key] = render()
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        self.entries.clear()
@@ -0,0 +1,123 @@
+import random
+import threading
+import time
+
+import requests
+
+from .rate_limit import RateLimitTimeout
+
+# HTTP statuses worth retrying: rate limiting and upstream/gateway trouble
+TRANSIENT_STATUS = frozenset([429, 500, 502, 503, 504])
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+def is_transient(exc):
+    if isinstance(exc, (requests.ConnectionError, requests.Timeout)):
+        return True
+    if isinstance(exc, requests.HTTPError) and exc.response is not None:
+        return exc.response.status_code in TRANSIENT_STATUS
+    return False
+
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    # Opens after failure_threshold consecutive transient failures; after reset_timeout
+    # one probe call is let through and its outcome closes or re-opens the circuit.
+    def __init__(self, failure_threshold=3, reset_timeout=15.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+
+    def allow(self):
+        with self.lock:
+            if self.state == self.OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self.probing = False
+            if self.state == self.HALF_OPEN:
+                if self.probing:
+                    return False
+                self.probing = True
+                return True
+            return self.state == self.CLOSED
+
+    def release(self):
+        # Gives back a half-open probe slot without a verdict on upstream
+        with self.lock:
+            self.probing = False
+
+    def record_success(self):
+        with self.lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.probing = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = self.clock()
+                self.probing = False
+
+
+class Resilience:
+    # Runs fn(*args, timeout=...) within a latency budget for the whole lookup, retrying
+    # transient errors with full-jitter exponential backoff. Only meant for idempotent calls.
+    def __init__(self, budget=3.0, retries=2, base_delay=0.1, max_delay=1.0, breaker=None,
+                 rng=None, clock=time.monotonic, sleep=time.sleep):
+        self.budget = budget
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = breaker if breaker is not None else CircuitBreaker(clock=clock)
+        self.rng = rng if rng is not None else random.Random()
+        self.clock = clock
+        self.sleep = sleep
+        self.calls = 0
+        self.retried = 0
+        self.failed = 0
+        self.short_circuited = 0
+
+    def call(self, fn, *args):
+        if not self.breaker.allow():
+            self.short_circuited += 1
+            raise CircuitOpenError("upstream marked unhealthy")
+        self.calls += 1
+        deadline = self.clock() + self.budget
+        attempt = 0
+        while True:
+            try:
+                result = fn(*args, timeout=max(deadline - self.clock(), 0.05))
+            except RateLimitTimeout:
+                # Throttled locally; says nothing about upstream health
+                self.breaker.release()
+                raise
+            except Exception as exc:
+                if not is_transient(exc):
+                    # Upstream answered; the request itself is the problem
+                    self.breaker.record_success()
+                    raise
+                attempt += 1
+                delay = self.rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                if attempt > self.retries or self.clock() + delay >= deadline:
+                    self.failed += 1
+                    self.breaker.record_failure()
+                    raise
+                self.retried += 1
+                self.sleep(delay)
+            else:
+                self.breaker.record_success()
+                return result
+
+    def stats(self):
+        return {"calls": self.calls, "retried": self.retried, "failed": self.failed,
+                "short_circuited": self.short_circuited, "circuit": self.breaker.state}
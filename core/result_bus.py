@@ -0,0 +1,49 @@
+import threading
+
+# How often the GUI thread applies posted results; bursts in between cost one update
+DRAIN_INTERVAL_MS = 33
+
+
+class ResultBus:
+    # Workers post results from any thread and the GUI thread drains them in batches.
+    # A key posted again before it was drained replaces the older value in place of
+    # being applied twice. Posted values are treated as read-only by both sides.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.posted = 0
+        self.coalesced = 0
+        self.batches = 0
+
+    def post(self, key, value):
+        with self.lock:
+            if self.pending.pop(key, None) is not None:
+                self.coalesced += 1
+            self.pending[key] = value
+            self.posted += 1
+
+    def post_many(self, items):
+        with self.lock:
+            for key, value in items:
+                if self.pending.pop(key, None) is not None:
+                    self.coalesced += 1
+                self.pending[key] = value
+                self.posted += 1
+
+    def drain(self):
+        # (key, value) pairs in the order their latest value arrived
+        with self.lock:
+            if not self.pending:
+                return []
+            items = list(self.pending.items())
+            self.pending = {}
+            self.batches += 1
+        return items
+
+    def clear(self):
+        with self.lock:
+            self.pending = {}
+
+    def stats(self):
+        with self.lock:
+            return {"posted": self.posted, "coalesced": self.coalesced, "batches": self.batches}
@@ -0,0 +1,68 @@
+import time
+from collections import Counter, deque
+
+
+class ScanFilter:
+    def __init__(self, k=3, n=5, ttl=30.0, clock=time.monotonic):
+        self.k = k
+        self.ttl = ttl
+        self.clock = clock
+        self.history = deque(maxlen=n)
+        self.counts = Counter()
+        self.active = set()
+        self.confirmed = set()
+        self.recent = {}
+        self.lookups_requested = 0
+        self.lookups_avoided = 0
+
+    def update(self, codes):
+        codes = set(codes)
+        if len(self.history) == self.history.maxlen:
+            for code in self.history[0]:
+                self.counts[code] -= 1
+                if self.counts[code] <= 0:
+                    del self.counts[code]
+                    # Dropped out of the window without ever reaching consensus: a misread
+                    if code not in self.confirmed:
+                        self.lookups_avoided += 1
+                    self.confirmed.discard(code)
+        self.history.append(codes)
+        self.counts.update(codes)
+
+        now = self.clock()
+        active = {code for code, count in self.counts.items() if count >= self.k}
+        lookups = []
+        for code in active - self.active:
+            seen = self.recent.get(code)
+            if seen is not None and now - seen < self.ttl:
+                self.lookups_avoided += 1
+            else:
+                lookups.append(code)
+        for code in active:
+            self.recent[code] = now
+        self.confirmed |= active
+        self.active = active
+        self.lookups_requested += len(lookups)
+
+        if len(self.recent) > 256:
+            self.recent = {c: t for c, t in self.recent.items() if now - t < self.ttl}
+        return lookups
+
+    def forget(self, code):
+        # Drops every trace of a code, so it needs a fresh consensus and is then looked up again
+        self.recent.pop(code, None)
+        self.active.discard(code)
+        self.confirmed.discard(code)
+        self.counts.pop(code, None)
+        for codes in self.history:
+            codes.discard(code)
+
+    def reset(self):
+        self.history.clear()
+        self.counts.clear()
+        self.active = set()
+        self.confirmed = set()
+        self.recent = {}
+
+    def stats(self):
+        return {"lookups_requested": self.lookups_requested, "lookups_avoided": self.lookups_avoided}
@@ -0,0 +1,56 @@
+import threading
+
+from .barcode import canonicalize_barcode
+from .nutrition import get_nutrition_batch
+from .prefetch import prefetcher
+from .product import FETCH_ERROR, OFFLINE
+from .result_bus import ResultBus
+from .scan_filter import ScanFilter
+
+
+class ScanSession:
+    # Everything between decoded frames and looked-up products for one scanner window:
+    # consensus filtering, in-flight lookups and the bus their results come back on.
+    # scan() and apply() run on the GUI thread; lookup threads only post to the bus.
+    def __init__(self, scan_filter=None, lookup=get_nutrition_batch):
+        self.scan_filter = scan_filter if scan_filter is not None else ScanFilter()
+        self.lookup = lookup
+        self.products = {}
+        self.pending = set()
+        self.results = ResultBus()
+
+    def scan(self, barcodes):
+        # Canonical code for each decoded barcode (None for invalid reads, which are never
+        # looked up) and the codes whose lookup this frame started
+        codes = [canonicalize_barcode(barcode.data, barcode.type) for barcode in barcodes]
+        valid_codes = [code for code in codes if code is not None]
+        new_codes = [code for code in self.scan_filter.update(valid_codes) if code not in self.pending]
+        if new_codes:
+            self.pending.update(new_codes)
+            threading.Thread(target=self._fetch, args=(new_codes,), daemon=True).start()
+        return codes, new_codes
+
+    def _fetch(self, codes):
+        with prefetcher.gate:
+            infos = self.lookup(codes)
+        self.results.post_many(infos.items())
+
+    def apply(self):
+        # Drains finished lookups; returns the (code, product) pairs in arrival order
+        results = self.results.drain()
+        for code, info in results:
+            self.pending.discard(code)
+            if info.status in (FETCH_ERROR, OFFLINE):
+                # Not an answer about the product: retry on the next consensus instead of caching
+                self.products.pop(code, None)
+                self.scan_filter.forget(code)
+            else:
+                self.products[code] = info
+        return results
+
+    def get(self, code):
+        return self.products.get(code)
+
+    def reset(self):
+        self.products.clear()
+        self.scan_filter.reset()
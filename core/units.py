@@ -0,0 +1,51 @@
+import re
+
+MASS_UNITS = {"g": 1.0, "gm": 1.0, "gram": 1.0, "grams": 1.0, "kg": 1000.0, "mg": 0.001,
+              "oz": 28.3495, "lb": 453.592}
+VOLUME_UNITS = {"ml": 1.0, "cl": 10.0, "dl": 100.0, "l": 1000.0, "litre": 1000.0, "liter": 1000.0,
+                "tsp": 5.0, "tbsp": 15.0, "cup": 240.0, "cups": 240.0}
+PIECE_UNITS = frozenset(["", "pc", "pcs", "piece", "pieces", "slice", "slices", "clove", "cloves",
+                         "whole", "nos", "no"])
+
+# Grams per millilitre; anything not listed is treated like water
+DENSITIES = {
+    "oil": 0.92, "olive oil": 0.91, "ghee": 0.91, "butter": 0.91, "milk": 1.03, "yogurt": 1.03,
+    "honey": 1.42, "water": 1.0, "salt": 1.2, "sugar": 0.85, "flour": 0.53, "rice": 0.85,
+    "spices": 0.5, "flattened rice": 0.35, "green peas": 0.6, "beans": 0.6,
+}
+DEFAULT_DENSITY = 1.0
+
+# Grams per piece
+PIECE_WEIGHTS = {
+    "bread slices": 30.0, "bread": 30.0, "egg": 50.0, "eggs": 50.0, "tomato": 120.0,
+    "onion": 110.0, "potato": 170.0, "carrot": 60.0, "cucumber": 300.0, "garlic": 5.0,
+    "banana": 120.0, "apple": 180.0, "cheese": 20.0, "lettuce": 8.0,
+}
+
+_AMOUNT = re.compile(r"^\s*(\d+(?:[.,]\d+)?)(?:\s*/\s*(\d+))?\s*([a-z]*)\.?\s*$")
+
+
+def parse_amount(text):
+    # "50g" -> (50.0, "g"); "1/2 cup" -> (0.5, "cup"); "2 pcs" -> (2.0, "pcs"); None if unreadable
+    match = _AMOUNT.match(str(text).lower())
+    if not match:
+        return None
+    value = float(match.group(1).replace(",", "."))
+    if match.group(2):
+        value /= float(match.group(2))
+    return value, match.group(3)
+
+
+def to_grams(ingredient, amount):
+    parsed = parse_amount(amount)
+    if parsed is None:
+        return None
+    value, unit = parsed
+    ingredient = ingredient.lower()
+    if unit in MASS_UNITS:
+        return value * MASS_UNITS[unit]
+    if unit in VOLUME_UNITS:
+        return value * VOLUME_UNITS[unit] * DENSITIES.get(ingredient, DEFAULT_DENSITY)
+    if unit in PIECE_UNITS and ingredient in PIECE_WEIGHTS:
+        return value * PIECE_WEIGHTS[ingredient]
+    return None
@@ -0,0 +1,112 @@
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# Run the app against it with OFF_BASE_URL=http://127.0.0.1:8080 python main.py
+PRODUCTS = {
+    "3017620422003": {"product_name": "Nutella", "ingredients_text": "Sugar, palm oil, hazelnuts 13%, skimmed milk powder 8.7%, fat-reduced cocoa 7.4%, emulsifier: lecithins (soy), vanillin",
+                      "nutriments": {"energy-kcal_100g": 539, "proteins_100g": 6.3, "fat_100g": 30.9, "saturated-fat_100g": 10.6, "sugars_100g": 56.3, "salt_100g": 0.107}},
+    "5449000000996": {"product_name": "Coca-Cola", "ingredients_text": "Carbonated water, sugar, colour (caramel e150d), acid (phosphoric acid), natural flavourings including caffeine",
+                      "nutriments": {"energy-kcal_100g": 42, "proteins_100g": 0, "fat_100g": 0, "sugars_100g": 10.6, "salt_100g": 0}},
+    "8901063010031": {"product_name": "Haldiram's Poha", "ingredients_text": "Flattened rice, peanuts, edible vegetable oil, salt, spices",
+                      "nutriments": {"energy-kcal_100g": 380, "proteins_100g": 7.5, "fat_100g": 9.2, "salt_100g": 1.1}},
+    "8076809513753": {"product_name": "Extra Virgin Olive Oil", "ingredients_text": "Extra virgin olive oil",
+                      "nutriments": {"energy-kcal_100g": 824, "proteins_100g": 0, "fat_100g": 91.6, "saturated-fat_100g": 13.8}},
+}
+
+_PRODUCT_PATH = re.compile(r"^/api/v[02]/product/(\d+)(?:\.json)?$")
+
+
+class FaultInjector:
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, error_status=503, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+    def next(self):
+        # (delay in seconds, status to fail with or None)
+        with self.lock:
+            self.requests += 1
+            delay = max(0.0, self.latency_ms + self.rng.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+            fail = self.rng.random() < self.error_rate
+            if fail:
+                self.errors += 1
+            return delay, self.error_status if fail else None
+
+
+def _project(code, product, fields):
+    doc = dict(product, code=code)
+    return {k: v for k, v in doc.items() if k in fields} if fields else doc
+
+
+def make_handler(faults, products=PRODUCTS):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            delay, status = faults.next()
+            time.sleep(delay)
+            if status is not None:
+                return self._send(status, {"status": 0, "status_verbose": "injected failure"})
+
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+            fields = set(query.get("fields", [""])[0].split(",")) - {""}
+            match = _PRODUCT_PATH.match(url.path)
+            if match:
+                code = match.group(1)
+                if code not in products:
+                    return self._send(404, {"code": code, "status": 0, "status_verbose": "product not found"})
+                return self._send(200, {"code": code, "status": 1, "status_verbose": "product found",
+                                        "product": _project(code, products[code], fields)})
+            if url.path == "/api/v2/search":
+                codes = query.get("code", [""])[0].split(",")
+                found = [_project(c, products[c], fields) for c in codes if c in products]
+                return self._send(200, {"count": len(found), "page": 1, "products": found})
+            self._send(404, {"status": 0, "status_verbose": "unknown endpoint"})
+
+        def _send(self, status, body):
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, fmt, *args):
+            pass
+
+    return Handler
+
+
+def serve(port=8080, faults=None, host="127.0.0.1"):
+    server = ThreadingHTTPServer((host, port), make_handler(faults or FaultInjector()))
+    server.daemon_threads = True
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for the Open Food Facts API with injected latency and errors")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with --error-status")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    server = serve(args.port, FaultInjector(args.latency_ms, args.jitter_ms, args.error_rate,
+                                            args.error_status, args.seed))
+    print(f"Fake Open Food Facts on http://127.0.0.1:{args.port} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
@@ -1,12 +1,17 @@
 from PyQt6.QtWidgets import *
 from PyQt6.QtCore import Qt, QTimer
 from PyQt6.QtGui import QPixmap, QImage
-import cv2, threading
+import cv2, html
 
 from core.cart import Cart
-from core.nutrition import get_nutrition_from_api, calculate_health_score, draw_circular_meter, safe_float
+from core.optimizer import suggest_weights
+from core.nutriscore import nutri_score
+from core.nutrition import product_health_score, draw_circular_meter
+from core.scan_session import ScanSession
+from core.result_bus import DRAIN_INTERVAL_MS
+from core.render_cache import RenderCache, product_version
 
-from pyzbar.pyzbar import decode
+from core.decoder import decode, start_decoder_selection
 
 class NutritionApp(QWidget):
     def __init__(self):
@@ -52,6 +57,10 @@ class NutritionApp(QWidget):
         self.fat_label.setStyleSheet(styled_label(""))
         info_layout.addWidget(self.fat_label)
 
+        self.nutriscore_label = QLabel("Nutri-Score: ")
+        self.nutriscore_label.setStyleSheet(styled_label(""))
+        info_layout.addWidget(self.nutriscore_label)
+
         self.ingredients_title = QLabel("🧪 Ingredients")
         self.ingredients_title.setStyleSheet("font-weight: bold; font-size: 14px; color: #00ffcc; margin-top: 10px;")
         info_layout.addWidget(self.ingredients_title)
@@ -126,6 +135,11 @@ class NutritionApp(QWidget):
         self.add_cart_btn.clicked.connect(self.add_to_cart)
         info_layout.addWidget(self.add_cart_btn)
 
+        self.suggest_btn = QPushButton("💡 Suggest Weights")
+        self.suggest_btn.setStyleSheet(style_button())
+        self.suggest_btn.clicked.connect(self.suggest_weights)
+        info_layout.addWidget(self.suggest_btn)
+
         self.finish_game_btn = QPushButton("🏁 Finish Game")
         self.finish_game_btn.setStyleSheet(style_button())
         self.finish_game_btn.clicked.connect(self.finish_game)
@@ -141,35 +155,40 @@ class NutritionApp(QWidget):
             QMessageBox.critical(self, "Camera Error", "Could not open webcam.")
             sys.exit(1)
 
-        self.last_scanned = ""
-        self.product_info = {}
+        start_decoder_selection()
+        self.session = ScanSession()
+        self.product_info = None
+        self.panels = RenderCache()
+        self.panel_key = None
         self.cart = Cart()
 
         self.timer = QTimer()
         self.timer.timeout.connect(self.update_frame)
         self.timer.start(30)
 
+        # Lookup results are applied on the GUI thread alone
+        self.results_timer = QTimer()
+        self.results_timer.timeout.connect(self.apply_results)
+        self.results_timer.start(DRAIN_INTERVAL_MS)
+
     def update_frame(self):
         ret, frame = self.cap.read()
         if not ret:
             return
 
         barcodes = decode(frame)
-        for barcode in barcodes:
-            barcode_data = barcode.data.decode('utf-8')
-            points = barcode.polygon
-
-            if barcode_data == self.last_scanned and self.product_info:
-                score = calculate_health_score(self.product_info.get("ingredient_analysis", {}))
-            else:
-                score = 0
-
-            draw_circular_meter(frame, points, score)
-
-            if barcode_data != self.last_scanned:
-                self.last_scanned = barcode_data
-                threading.Thread(target=self.fetch_product_info, args=(barcode_data,), daemon=True).start()
-            break
+        codes, new_codes = self.session.scan(barcodes)
+        for barcode_data, barcode in zip(codes, barcodes):
+            info = self.session.get(barcode_data)
+            score = product_health_score(info) if info else 0
+            draw_circular_meter(frame, barcode.polygon, score)
+
+        if not new_codes and len(barcodes) == 1:
+            # A single known product in view becomes the one shown in the panel
+            info = self.session.get(codes[0])
+            if info is not None and info is not self.product_info:
+                self.product_info = info
+                self.update_info_panel()
 
         frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
         h, w, ch = frame.shape
@@ -177,51 +196,82 @@ class NutritionApp(QWidget):
         qimg = QImage(frame.data, w, h, bytes_per_line, QImage.Format.Format_RGB888)
         self.video_label.setPixmap(QPixmap.fromImage(qimg))
 
-    def fetch_product_info(self, barcode_data):
-        info = get_nutrition_from_api(barcode_data)
-        self.product_info = info
-        QTimer.singleShot(0, self.update_info_panel)
+    def apply_results(self):
+        results = self.session.apply()
+        if not results:
+            return
+        self.product_info = results[-1][1]
+        self.update_info_panel()
 
     def update_info_panel(self):
         info = self.product_info
-        self.name_label.setText(f"Product Name: {info['name']}")
-        self.calories_label.setText(f"Calories: {info['calories']}")
-        self.protein_label.setText(f"Protein: {info['protein']}")
-        self.fat_label.setText(f"Fat: {info['fat']}")
-
-        self.ingredients_text.clear()
-        self.ingredients_text.append(info['ingredients'] + "\n")
-
-        ia = info.get("ingredient_analysis", {})
+        product_health_score(info)  # refreshes the analysis if the taxonomy changed
+        key = product_version(info)
+        if key == self.panel_key:
+            return
+        name, calories, protein, fat, score, ingredients = self.panels.get(key, lambda: self.render_panel(info))
+        self.name_label.setText(name)
+        self.calories_label.setText(calories)
+        self.protein_label.setText(protein)
+        self.fat_label.setText(fat)
+        self.nutriscore_label.setText(score)
+        self.ingredients_text.setHtml(ingredients)
+        self.panel_key = key
+
+    def render_panel(self, info):
+        if info.found:
+            points, grade = nutri_score(info.nutriments)
+            score = f"Nutri-Score: {grade} ({points})"
+        else:
+            score = "Nutri-Score: N/A"
+
+        parts = [html.escape(info.ingredients).replace("\n", "<br>") + "<br>"]
+        ia = info.ingredient_analysis
         if ia:
             if ia['unhealthy']:
-                self.ingredients_text.append(f"<span style='color:red;'>❌ Unhealthy: {', '.join(ia['unhealthy'])}</span>")
+                parts.append(f"<span style='color:red;'>❌ Unhealthy: {html.escape(', '.join(ia['unhealthy']))}</span>")
             if ia['allergens']:
-                self.ingredients_text.append(f"<span style='color:orange;'>⚠️ Allergens: {', '.join(ia['allergens'])}</span>")
+                parts.append(f"<span style='color:orange;'>⚠️ Allergens: {html.escape(', '.join(ia['allergens']))}</span>")
             if ia['suspicious']:
-                self.ingredients_text.append(f"<span style='color:#ffaa00;'>🧪 Suspicious: {', '.join(ia['suspicious'])}</span>")
+                parts.append(f"<span style='color:#ffaa00;'>🧪 Suspicious: {html.escape(', '.join(ia['suspicious']))}</span>")
             if ia['natural']:
-                self.ingredients_text.append(f"<span style='color:lightgreen;'>✅ Natural: {', '.join(ia['natural'][:5])}...</span>")
+                parts.append(f"<span style='color:lightgreen;'>✅ Natural: {html.escape(', '.join(ia['natural'][:5]))}...</span>")
 
+        return (f"Product Name: {info.name}",
+                f"Calories: {info.calories_text()}",
+                f"Protein: {info.protein_text()}",
+                f"Fat: {info.fat_text()}",
+                score,
+                "".join(f"<p>{part}</p>" for part in parts))
 
     def add_to_cart(self):
-        if self.product_info and self.product_info['name'] != "Product not found":
+        if self.product_info is not None and self.product_info.found:
             try:
                 weight = float(self.weight_input.text())
             except ValueError:
                 self.status_label.setText("❌ Invalid weight entered")
                 return
 
-            factor = weight / 100.0  # because values are per 100g
-            scaled_product = self.product_info.copy()
-            scaled_product['calories'] = f"{safe_float(self.product_info['calories']) * factor:.2f} kcal"
-            scaled_product['fat'] = f"{safe_float(self.product_info['fat']) * factor:.2f} g"
-            scaled_product['protein'] = f"{safe_float(self.product_info['protein']) * factor:.2f} g"
+            self.cart.add_item(self.product_info, weight)
+            self.status_label.setText(f"✅ Added {weight}g of {self.product_info.name} to cart")
+
 
-            self.cart.add_item(scaled_product)
-            self.status_label.setText(f"✅ Added {weight}g of {self.product_info['name']} to cart")
 
+    def suggest_weights(self):
+        if not self.cart.items:
+            self.status_label.setText("🛒 Add products to the cart first")
+            return
 
+        suggestion = suggest_weights(self.cart)
+        lines = [f"• {product.name}: {weight:.0f} g" if weight > 0 else f"• {product.name}: leave out"
+                 for product, weight in zip(suggestion.products, suggestion.weights)]
+        lines.append("")
+        lines.extend(f"{'✅' if suggestion.passed.get(c.key) else '❌'} {c.label}"
+                     for c in self.cart.ruleset.challenges)
+        if not any(suggestion.passed.values()):
+            lines.append("No mix found that passes a challenge")
+        lines.append(f"\n🎯 Best score: {suggestion.score:.0f}")
+        QMessageBox.information(self, "Suggested Weights", "\n".join(lines))
 
     def finish_game(self):
         score = self.cart.game_score()
@@ -229,17 +279,16 @@ class NutritionApp(QWidget):
         fat = self.cart.total_fat()
         protein = self.cart.total_protein()
 
-        challenge1 = self.cart.challenge_1500_kcal()
-        challenge2 = self.cart.challenge_protein_rich()
+        challenges = [(c.label, passed) for c, passed in self.cart.challenge_results()]
 
         def restart_game():
             self.cart.clear()
             self.status_label.setText("🛒 Cart Cleared. Play Again!")
-            self.last_scanned = ""  # 🔁 Reset last scanned
+            self.session.reset()  # 🔁 Forget scanned products
 
         self.game_over_window = GameOverWindow(
             score, cal, fat, protein,
-            challenge1, challenge2,
+            challenges,
             on_play_again=restart_game
         )
         self.game_over_window.show()
@@ -250,7 +299,7 @@ class NutritionApp(QWidget):
         event.accept()
 
 class GameOverWindow(QWidget):
-    def __init__(self, score, calories, fat, protein, challenge1, challenge2, on_play_again):
+    def __init__(self, score, calories, fat, protein, challenges, on_play_again):
         super().__init__()
         self.setWindowTitle("🎉 Game Over")
         self.setFixedSize(500, 400)
@@ -268,9 +317,9 @@ class GameOverWindow(QWidget):
         🔥 Calories: {calories:.1f} kcal<br>
         🧈 Fat: {fat:.1f} g<br>
         🥩 Protein: {protein:.1f} g<br><br>
-        {"✅" if challenge1 else "❌"} Challenge 1: Under 1500 kcal<br>
-        {"✅" if challenge2 else "❌"} Challenge 2: High Protein, Low Fat
         """
+        stats += "<br>".join(f"{'✅' if passed else '❌'} Challenge {i}: {label}"
+                             for i, (label, passed) in enumerate(challenges, 1))
         stats_label = QLabel(stats)
         stats_label.setStyleSheet("font-size: 16px;")
         stats_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
@@ -6,15 +6,21 @@ from PyQt6.QtWidgets import (
 )
 from PyQt6.QtCore import Qt, QTimer
 from PyQt6.QtGui import QPixmap, QImage
-import cv2, threading
+import cv2, html
 
-from pyzbar.pyzbar import decode
-from core.nutrition import get_nutrition_from_api, calculate_health_score, draw_circular_meter, safe_float
+from core.decoder import decode, start_decoder_selection
+from core.nutrition import product_health_score, draw_circular_meter
 from core.cart import Cart
+from core.matcher import IngredientMatcher
+from core.product import ENERGY_KCAL, PROTEINS, FAT
+from core.prefetch import prefetcher
+from core.scan_session import ScanSession
+from core.result_bus import DRAIN_INTERVAL_MS
+from core.render_cache import RenderCache, product_version
 
 
 class RecipeNutritionScanner(QWidget):
-    def __init__(self, recipe_name, ingredients):
+    def __init__(self, recipe_name, ingredients, expected=None):
         super().__init__()
         self.setWindowTitle(f"Recipe Nutrition Scanner - {recipe_name}")
         self.setFixedSize(1080, 520)
@@ -22,8 +28,9 @@ class RecipeNutritionScanner(QWidget):
 
         self.recipe_name = recipe_name
         self.ingredients = ingredients
+        self.expected = expected
         self.cart = Cart()
-        self.product_info = {}
+        self.product_info = None
 
         main_layout = QHBoxLayout(self)
 
@@ -47,6 +54,7 @@ class RecipeNutritionScanner(QWidget):
             checkbox.setStyleSheet("font-size: 14px; color: white; margin-bottom: 4px;")
             info_layout.addWidget(checkbox)
             self.checkbox_widgets[ing_name.lower()] = checkbox
+        self.matcher = IngredientMatcher(self.checkbox_widgets)
 
         self.nutrition_text = QTextEdit()
         self.nutrition_text.setReadOnly(True)
@@ -95,11 +103,18 @@ class RecipeNutritionScanner(QWidget):
             QMessageBox.critical(self, "Camera Error", "Webcam not accessible")
             self.close()
 
-        self.last_scanned = ""
+        start_decoder_selection()
+        self.session = ScanSession()
         self.timer = QTimer()
         self.timer.timeout.connect(self.update_frame)
         self.timer.start(30)
 
+        self.panels = RenderCache()
+        self.panel_key = None
+        self.results_timer = QTimer()
+        self.results_timer.timeout.connect(self.apply_results)
+        self.results_timer.start(DRAIN_INTERVAL_MS)
+
     def button_style(self):
         return """
         QPushButton {
@@ -121,51 +136,52 @@ class RecipeNutritionScanner(QWidget):
             return
 
         barcodes = decode(frame)
-        for barcode in barcodes:
-            barcode_data = barcode.data.decode("utf-8")
-            points = barcode.polygon
-
-            if barcode_data != self.last_scanned:
-                self.last_scanned = barcode_data
-                threading.Thread(target=self.fetch_ingredient_info, args=(barcode_data,), daemon=True).start()
-
-            draw_circular_meter(frame, points, 0)
-            break
+        codes, _ = self.session.scan(barcodes)
+        for barcode_data, barcode in zip(codes, barcodes):
+            info = self.session.get(barcode_data)
+            score = product_health_score(info) if info else 0
+            draw_circular_meter(frame, barcode.polygon, score)
 
         frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
         h, w, ch = frame.shape
         qimg = QImage(frame.data, w, h, ch * w, QImage.Format.Format_RGB888)
         self.video_label.setPixmap(QPixmap.fromImage(qimg))
 
-    def fetch_ingredient_info(self, barcode):
-        info = get_nutrition_from_api(barcode)
-        self.product_info = info
-        name = info.get("name", "").lower()
-
-        matched = None
-        for ing in self.checkbox_widgets.keys():
-            if ing in name:
-                matched = ing
-                break
+    def apply_results(self):
+        results = self.session.apply()
+        if not results:
+            return
+        for _, info in results:
+            self.product_info = info
 
-        if matched:
-            self.checkbox_widgets[matched].setChecked(True)
-            self.status_label.setText(f"✅ Scanned: {info['name']}")
-        else:
-            self.status_label.setText(f"❌ Unknown item: {info['name']}")
+            match = self.matcher.match(info.name) if info.found else None
+            if match:
+                prefetcher.history.record(match[0], info.barcode)
+                self.checkbox_widgets[match[0]].setChecked(True)
+                self.status_label.setText(f"✅ Scanned: {info.name}")
+            else:
+                self.status_label.setText(f"❌ Unknown item: {info.name}")
 
-        self.update_info_panel(info)
+        self.update_info_panel(self.product_info)
 
     def update_info_panel(self, info):
-        self.nutrition_text.clear()
-        self.nutrition_text.append(f"📦 {info.get('name', '')}")
-        self.nutrition_text.append(f"🔥 Calories: {info.get('calories', 'N/A')}")
-        self.nutrition_text.append(f"🍗 Protein: {info.get('protein', 'N/A')}")
-        self.nutrition_text.append(f"🧈 Fat: {info.get('fat', 'N/A')}")
-        self.nutrition_text.append(f"\n{info.get('ingredients', '')}")
+        key = product_version(info)
+        if key == self.panel_key:
+            return
+        self.nutrition_text.setHtml(self.panels.get(key, lambda: self.render_panel(info)))
+        self.panel_key = key
+
+    def render_panel(self, info):
+        lines = [f"📦 {info.name}",
+                 f"🔥 Calories: {info.calories_text()}",
+                 f"🍗 Protein: {info.protein_text()}",
+                 f"🧈 Fat: {info.fat_text()}",
+                 "",
+                 info.ingredients]
+        return "<br>".join(html.escape(line) for line in lines)
 
     def add_to_cart(self):
-        if self.product_info.get("name") == "Product not found":
+        if self.product_info is None or not self.product_info.found:
             return
 
         try:
@@ -174,14 +190,8 @@ class RecipeNutritionScanner(QWidget):
             self.status_label.setText("❌ Invalid weight")
             return
 
-        factor = weight / 100.0
-        scaled = self.product_info.copy()
-        scaled['calories'] = f"{safe_float(scaled['calories']) * factor:.2f} kcal"
-        scaled['fat'] = f"{safe_float(scaled['fat']) * factor:.2f} g"
-        scaled['protein'] = f"{safe_float(scaled['protein']) * factor:.2f} g"
-
-        self.cart.add_item(scaled)
-        self.status_label.setText(f"✅ Added {weight}g of {scaled['name']}")
+        self.cart.add_item(self.product_info, weight)
+        self.status_label.setText(f"✅ Added {weight}g of {self.product_info.name}")
 
     def finish_recipe(self):
         total = len(self.ingredients)
@@ -193,19 +203,20 @@ class RecipeNutritionScanner(QWidget):
         protein = self.cart.total_protein()
 
         self.summary_window = RecipeSummaryWindow(
-            self.recipe_name, total, scanned, completion, cal, fat, protein
+            self.recipe_name, total, scanned, completion, cal, fat, protein, self.expected
         )
         self.summary_window.show()
 
     def closeEvent(self, event):
         self.cap.release()
+        prefetcher.history.save()
         event.accept()
 
 
 # --- RECIPE SUMMARY WINDOW ---
 
 class RecipeSummaryWindow(QWidget):
-    def __init__(self, recipe_name, total, scanned, completion, calories, fat, protein):
+    def __init__(self, recipe_name, total, scanned, completion, calories, fat, protein, expected=None):
         super().__init__()
         self.setWindowTitle("🍽️ Recipe Summary")
         self.setFixedSize(500, 400)
@@ -226,6 +237,12 @@ class RecipeSummaryWindow(QWidget):
         🧈 Fat: {fat:.1f} g<br>
         🍗 Protein: {protein:.1f} g
         """
+        if expected is not None:
+            stats += f"""<br><br>
+        📐 Recipe estimate: {expected[ENERGY_KCAL]:.0f} kcal ·
+        {expected[FAT]:.1f} g fat · {expected[PROTEINS]:.1f} g protein<br>
+        Δ Calories: {calories - expected[ENERGY_KCAL]:+.0f} kcal
+        """
         label = QLabel(stats)
         label.setStyleSheet("font-size: 16px;")
         label.setTextFormat(Qt.TextFormat.RichText)
@@ -1,13 +1,53 @@
+import math
+
 from PyQt6.QtWidgets import *
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QAbstractListModel, QModelIndex
 from .nutrition_app import NutritionApp
 from .recipe_nutrition_scanner import RecipeNutritionScanner  # Import the new widget
+from core.recipes import RecipeStore
+from core.recipe_ranking import RecipeRanker
+from core.product import ENERGY_KCAL, PROTEINS, FAT
+from core.prefetch import prefetcher
+
+MAX_KCAL_SLIDER = 2000  # the slider's top position means "no limit"
+SORT_OPTIONS = [("💚 Healthiest first", "health"), ("🍗 Most protein", "protein"),
+                ("🔥 Fewest calories", "calories"), ("📜 Catalog order", "catalog")]
+
+
+class RecipeListModel(QAbstractListModel):
+    # Rows are indices into the store; the view only asks for the rows it paints
+    def __init__(self, store):
+        super().__init__()
+        self.store = store
+        self.rows = list(range(len(store)))
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        recipe = self.store[self.rows[index.row()]]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return recipe.name
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return recipe.region
+        return None
+
+    def recipe(self, index):
+        return self.store[self.rows[index.row()]]
+
+    def set_rows(self, rows):
+        self.beginResetModel()
+        self.rows = rows
+        self.endResetModel()
+
 
 class RecipeScannerWindow(QWidget):
     def __init__(self, main_menu=None):
         super().__init__()
         self.setWindowTitle("📋 Recipe Scanner")
-        self.setFixedSize(460, 500)
+        self.setFixedSize(460, 600)
         self.setStyleSheet("background-color: #121212; color: white;")
         self.scan_window = None
         self.main_menu = main_menu
@@ -60,43 +100,53 @@ class RecipeScannerWindow(QWidget):
         recipe_layout.setContentsMargins(10, 10, 10, 10)
         recipe_layout.setSpacing(8)
 
-        self.dishes = {
-            '🥣 Poha': [
-                ('Flattened rice', '50g'),
-                ('Onion', '30g'),
-                ('Green peas', '20g'),
-                ('Oil', '5ml')
-            ],
-            '🥪 Sandwich': [
-                ('Bread slices', '2 pcs'),
-                ('Cheese', '20g'),
-                ('Tomato', '25g'),
-                ('Cucumber', '30g')
-            ],
-            '🍵 Soup': [
-                ('Carrot', '40g'),
-                ('Beans', '30g'),
-                ('Salt', '5g'),
-                ('Water', '250ml')
-            ],
-            '🥗 Salad': [
-                ('Lettuce', '50g'),
-                ('Cucumber', '30g'),
-                ('Tomato', '40g'),
-                ('Olive oil', '10ml')
-            ],
-            '🍚 Rice Dish': [
-                ('Rice', '100g'),
-                ('Vegetables', '50g'),
-                ('Ghee', '10g'),
-                ('Spices', '5g')
-            ]
-        }
-
-        self.recipe_list = QListWidget()
-        self.recipe_list.addItems(self.dishes.keys())
+        self.store = RecipeStore.load()
+
+        self.search_box = QLineEdit()
+        self.search_box.setPlaceholderText("🔍 Search recipes, regions or ingredients")
+        self.search_box.setStyleSheet("""
+            QLineEdit {
+                background-color: #1f1f1f;
+                color: white;
+                font-size: 13px;
+                border: 1px solid #00ffcc;
+                border-radius: 6px;
+                padding: 4px;
+            }
+        """)
+        self.search_box.textChanged.connect(self.filter_recipes)
+        recipe_layout.addWidget(self.search_box)
+
+        # 🎚️ Nutrition goals: re-rank the whole catalog live as the sliders move
+        self.ranker = RecipeRanker.from_store(self.store)
+        goals_layout = QGridLayout()
+        self.kcal_label = QLabel()
+        self.kcal_slider = QSlider(Qt.Orientation.Horizontal)
+        self.kcal_slider.setRange(100, MAX_KCAL_SLIDER)
+        self.kcal_slider.setSingleStep(50)
+        self.kcal_slider.setValue(MAX_KCAL_SLIDER)
+        self.protein_label = QLabel()
+        self.protein_slider = QSlider(Qt.Orientation.Horizontal)
+        self.protein_slider.setRange(0, 60)
+        self.sort_box = QComboBox()
+        for label, key in SORT_OPTIONS:
+            self.sort_box.addItem(label, key)
+        goals_layout.addWidget(self.kcal_label, 0, 0)
+        goals_layout.addWidget(self.kcal_slider, 0, 1)
+        goals_layout.addWidget(self.protein_label, 1, 0)
+        goals_layout.addWidget(self.protein_slider, 1, 1)
+        goals_layout.addWidget(self.sort_box, 2, 0, 1, 2)
+        self.kcal_slider.valueChanged.connect(self.filter_recipes)
+        self.protein_slider.valueChanged.connect(self.filter_recipes)
+        self.sort_box.currentIndexChanged.connect(self.filter_recipes)
+        recipe_layout.addLayout(goals_layout)
+
+        self.recipe_model = RecipeListModel(self.store)
+        self.recipe_list = QListView()
+        self.recipe_list.setModel(self.recipe_model)
+        self.recipe_list.setUniformItemSizes(True)
         self.recipe_list.setStyleSheet("""
-            QListWidget {
+            QListView {
                 background-color: #1f1f1f;
                 color: white;
                 font-size: 14px;
@@ -104,13 +154,13 @@ class RecipeScannerWindow(QWidget):
                 border-radius: 6px;
                 padding: 6px;
             }
-            QListWidget::item:selected {
+            QListView::item:selected {
                 background-color: #00ffcc;
                 color: black;
                 font-weight: bold;
             }
         """)
-        self.recipe_list.itemClicked.connect(self.display_ingredients)
+        self.recipe_list.clicked.connect(self.display_ingredients)
         recipe_layout.addWidget(self.recipe_list)
         recipe_box.setLayout(recipe_layout)
         layout.addWidget(recipe_box)
@@ -150,20 +200,43 @@ class RecipeScannerWindow(QWidget):
         layout.addWidget(self.scan_button)
 
         self.setLayout(layout)
+        self.filter_recipes()
+
+    def filter_recipes(self, *_):
+        max_kcal = self.kcal_slider.value()
+        min_protein = self.protein_slider.value()
+        self.kcal_label.setText(f"🔥 ≤ {max_kcal} kcal" if max_kcal < MAX_KCAL_SLIDER else "🔥 Any kcal")
+        self.protein_label.setText(f"🍗 ≥ {min_protein} g protein")
+
+        text = self.search_box.text()
+        rows = self.store.search(text) if text.strip() else None
+        self.recipe_model.set_rows(self.ranker.query(
+            max_kcal=max_kcal if max_kcal < MAX_KCAL_SLIDER else math.inf,
+            min_protein=min_protein,
+            sort=self.sort_box.currentData(),
+            rows=rows,
+        ))
+        self.ingredient_display.clear()
 
-    def display_ingredients(self, item):
-        dish = item.text()
-        ingredients = self.dishes.get(dish, [])
-        text = "\n".join([f"• {name}: {amount}" for name, amount in ingredients])
+    def display_ingredients(self, index):
+        recipe = self.recipe_model.recipe(index)
+        prefetcher.warm(name for name, _ in recipe.ingredients)
+        text = "\n".join([f"• {name}: {amount}" for name, amount in recipe.ingredients])
+        if recipe.coverage > 0:
+            n = recipe.nutrients
+            text += (f"\n\n📐 Expected: 🔥 {n[ENERGY_KCAL]:.0f} kcal · 🍗 {n[PROTEINS]:.1f} g protein"
+                     f" · 🧈 {n[FAT]:.1f} g fat")
+            if recipe.coverage < 1:
+                text += f" ({recipe.coverage:.0%} of ingredients known)"
         self.ingredient_display.setText(text)
 
     def open_scanner(self):
-        selected_item = self.recipe_list.currentItem()
-        if selected_item:
-            dish_name = selected_item.text()
-            ingredients = self.dishes.get(dish_name, [])
+        index = self.recipe_list.currentIndex()
+        if index.isValid():
+            recipe = self.recipe_model.recipe(index)
 
-            self.scan_window = RecipeNutritionScanner(dish_name, ingredients)
+            expected = recipe.nutrients if recipe.coverage > 0 else None
+            self.scan_window = RecipeNutritionScanner(recipe.name, recipe.ingredients, expected)
             self.scan_window.show()
             self.hide()
 